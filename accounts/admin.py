@@ -3,6 +3,7 @@ from django.utils.html import format_html
 
 from accounts.models import User, VendorProfile, OTPRequest
 from crm.admin import BaseAdmin
+from media.services import get_media_url
 
 
 from django.contrib import admin
@@ -120,7 +121,7 @@ class VendorProfileAdmin(admin.ModelAdmin):
         if obj.business_logo:
             return format_html(
                 '<img src="{}" width="50" height="50" style="border-radius:5px;object-fit:cover;" />',
-                obj.business_logo.url,
+                get_media_url(obj.business_logo),
             )
         return "—"
 
@@ -128,7 +129,7 @@ class VendorProfileAdmin(admin.ModelAdmin):
         if obj.business_logo:
             return format_html(
                 '<img src="{}" width="150" style="border-radius:8px;object-fit:cover;" />',
-                obj.business_logo.url,
+                get_media_url(obj.business_logo),
             )
         return "No logo uploaded"
 
@@ -136,7 +137,7 @@ class VendorProfileAdmin(admin.ModelAdmin):
         if obj.id_card:
             return format_html(
                 '<img src="{}" width="150" style="border-radius:8px;object-fit:cover;" />',
-                obj.id_card.url,
+                get_media_url(obj.id_card),
             )
         return "No ID card uploaded"
 
@@ -144,7 +145,7 @@ class VendorProfileAdmin(admin.ModelAdmin):
         if obj.profile_photo:
             return format_html(
                 '<img src="{}" width="150" style="border-radius:8px;object-fit:cover;" />',
-                obj.profile_photo.url,
+                get_media_url(obj.profile_photo),
             )
         return "No profile photo uploaded"
 
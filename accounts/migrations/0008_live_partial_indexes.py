@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_alter_user_is_verified_otprequest_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendorprofile',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['status'], name='vendor_live_status_idx'),
+        ),
+    ]
@@ -1,15 +1,15 @@
 from datetime import timedelta
 
-import cloudinary
 from cloudinary.models import CloudinaryField
 from django.contrib.auth.base_user import BaseUserManager, AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
+from django.core.files import File
 from django.db import models
 from django.db.models import TextChoices
 from django.utils import timezone
 
 
-from crm.models import BaseModel
+from crm.models import LIVE, BaseModel
 
 
 class VendorStatus(models.TextChoices):
@@ -149,6 +149,14 @@ class VendorProfile(BaseModel):
     )
     business_email = models.EmailField(max_length=254, blank=True, null=True)
 
+    # approval and rejection emails are sent on a status change
+    tracked_fields = ("status",)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status"], condition=LIVE, name="vendor_live_status_idx"),
+        ]
+
     def __str__(self):
         return f"{self.business_name} - {self.user.email}"
 
@@ -157,24 +165,15 @@ class VendorProfile(BaseModel):
         upload_fields = ["business_logo", "id_card", "profile_photo"]
 
         if save_files:
-            if self.pk:  # updating
-                old = type(self).objects.filter(pk=self.pk).first()
-            else:
-                old = None
+            from media.services import MediaStore
 
+            store = MediaStore()
             for field in upload_fields:
                 file_field = getattr(self, field)
-                old_value = getattr(old, field) if old else None
-
-                if file_field and (not old_value or str(file_field) != str(old_value)):
-                    upload = cloudinary.uploader.upload(
-                        file_field,
-                        folder=field,
-                        public_id=self.business_name.replace(" ", "_").lower(),
-                        overwrite=True,
-                        resource_type="image"
-                    )
-                    setattr(self, field, upload["public_id"])
+
+                # unchanged fields hold the stored public_id, only new files are sent
+                if isinstance(file_field, File):
+                    setattr(self, field, store.put(file_field, folder=field))
 
         if self.pk:
             from crm.tasks import send_email_notification
@@ -183,8 +182,8 @@ class VendorProfile(BaseModel):
             email_context = {
                 'vendor_name' : self.business_name
             }
-            old_vendor = VendorProfile.objects.get(pk=self.pk)
-            if old_vendor.status != self.status and self.status == VendorStatus.approved:
+            status_changed = self.has_changed("status")
+            if status_changed and self.status == VendorStatus.approved:
                 self.user.user_type = UserTypes.vendor
                 self.user.save()
 
@@ -194,7 +193,7 @@ class VendorProfile(BaseModel):
                 )
 
 
-            if old_vendor.status != self.status and self.status == VendorStatus.rejected:
+            if status_changed and self.status == VendorStatus.rejected:
 
                 self.user.save()
 
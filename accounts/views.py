@@ -16,9 +16,10 @@ from accounts.services.user_service import UserService
 from accounts.services.vendor_service import VendorService
 from payments.models import Order, OrderItem, OrderStatusChoices, PaymentStatus
 from payments.services.order_service import OrderService, OrderItemService
-from products.models import Product
+from products.models import Product, RankingScope
 from products.services.product_service import ProductService
 from products.services.wishlist_service import WishlistService
+from services.query import related_exists
 from services.util import CustomRequestUtil, vendor_required, customer_required
 
 
@@ -227,7 +228,7 @@ class VendorDashboardView(LoginRequiredMixin, View, CustomRequestUtil):
             )
             return redirect("onboard-vendor")
 
-        total_orders = Order.objects.filter(items__product__created_by=self.auth_user).distinct().count()
+        total_orders = Order.objects.filter(related_exists(Order, "items", product__created_by=self.auth_user)).count()
         delivered_orders = OrderItem.objects.filter(
             product__created_by=self.auth_user, status=OrderStatusChoices.delivered, order__payment_status=PaymentStatus.paid
         ).count() or 0
@@ -247,7 +248,9 @@ class VendorDashboardView(LoginRequiredMixin, View, CustomRequestUtil):
         )["total"] or 0
 
         latest_order_items = order_service.fetch_list()[:5]
-        trending_products = product_service.fetch_list(vendor=self.auth_vendor_profile).order_by('-views')[:5]
+        trending_products = product_service.get_trending_products(
+            scope=RankingScope.vendor, scope_id=self.auth_vendor_profile.user_id, limit=5
+        )
 
         self.extra_context_data["shipped_orders"] = shipped_orders
         self.extra_context_data["delivered_orders"] = delivered_orders
@@ -2,7 +2,7 @@ from django.urls import path
 from accounts.views import check_email, get_banks, verify_bank_account, resend_otp
 from crm.views import BannerAPIView
 from media.views import delete_product_image
-from products.views import get_subcategories, ProductAutocompleteView
+from products.views import get_subcategories, ProductAutocompleteView, HeaderSearchView
 
 urlpatterns = [
     path("check-email/", check_email, name="check_email"),
@@ -12,6 +12,7 @@ urlpatterns = [
     path("delete-product-image/<int:upload_id>/", delete_product_image, name='delete-product-image'),
     path("resend-otp/", resend_otp, name='resend-otp'),
     path("search/autocomplete/", ProductAutocompleteView.as_view(), name='autocomplete'),
+    path("search/header/", HeaderSearchView.as_view(), name='header-search'),
     path("banners/", BannerAPIView.as_view(), name='banners'),
 
 
@@ -28,10 +28,7 @@ class CartService(CustomRequestUtil):
             item = self.cart[str(product.id)].copy()
             item['product'] = product
 
-            if product.percentage_discount:
-                item['total_price'] = int(product.discounted_price * item['quantity'])
-            else:
-                item['total_price'] = int(product.price * item['quantity'])
+            item['total_price'] = int(product.effective_price * item['quantity'])
 
             yield item
 
@@ -92,10 +89,7 @@ class CartService(CustomRequestUtil):
             qty = value['quantity']
             for product in products:
                 if key == product.id:
-                    if product.percentage_discount:
-                        total = total + (product.discounted_price * qty)
-                    else:
-                        total = total + (product.price * qty)
+                    total = total + (product.effective_price * qty)
 
         return total
 
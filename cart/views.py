@@ -6,6 +6,7 @@ from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_exempt
 
 from cart.services.cart_service import CartService
+from products.services.product_service import ProductService
 
 
 def add_to_cart(request):
@@ -90,7 +91,11 @@ def cart(request):
         messages.error(request, "There are no items in your cart")
         return redirect("home")
 
+    product_service = ProductService(request)
     context = {
-        "title": "Cart"
+        "title": "Cart",
+        "frequently_bought_together": product_service.get_frequently_bought_together(
+            request.session["cart"].keys()
+        ),
     }
     return render(request, 'frontend/cart.html', context)
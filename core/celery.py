@@ -14,4 +14,44 @@ app.autodiscover_tasks()
 #         'task': 'library.tasks.notify_due_loans',
 #         'schedule': crontab(hour=1, minute=20),  # every day at 08:00
 #     },
-# }
\ No newline at end of file
+# }
+
+app.conf.beat_schedule = {
+    'ingest-search-queries': {
+        'task': 'products.tasks.ingest_search_queries',
+        'schedule': crontab(),  # every minute
+    },
+    'apply-sale-transitions': {
+        'task': 'products.tasks.apply_sale_transitions',
+        'schedule': crontab(),  # every minute
+    },
+    # safety net for rows changed without Product.save (bulk updates, shell)
+    'refresh-effective-prices': {
+        'task': 'products.tasks.refresh_effective_prices',
+        'schedule': crontab(minute=0),  # hourly
+    },
+    'refresh-trending-products': {
+        'task': 'products.tasks.refresh_trending_products',
+        'schedule': crontab(minute='*/15'),
+    },
+    'refresh-best-sellers': {
+        'task': 'products.tasks.refresh_best_sellers',
+        'schedule': crontab(minute='5,35'),
+    },
+    'update-copurchases': {
+        'task': 'products.tasks.update_copurchases',
+        'schedule': crontab(minute=20),  # hourly
+    },
+    'rebuild-related-products': {
+        'task': 'products.tasks.rebuild_related_products',
+        'schedule': crontab(hour=2, minute=30),  # nightly
+    },
+    'rebuild-similar-products': {
+        'task': 'products.tasks.rebuild_similar_products',
+        'schedule': crontab(hour=3, minute=0),  # nightly
+    },
+    'collect-orphaned-media': {
+        'task': 'media.tasks.collect_orphaned_media',
+        'schedule': crontab(hour=4, minute=0, day_of_week='sunday'),  # weekly
+    },
+}
@@ -123,6 +123,68 @@ ELASTICSEARCH_DSL = {
     }
 }
 
+# Bulk (re)indexing, see products.services.search_index_service
+SEARCH_INDEX_CHUNK_SIZE = int(os.getenv('SEARCH_INDEX_CHUNK_SIZE', 1000))
+SEARCH_INDEX_BULK_CHUNK_SIZE = int(os.getenv('SEARCH_INDEX_BULK_CHUNK_SIZE', 500))
+SEARCH_INDEX_WORKERS = int(os.getenv('SEARCH_INDEX_WORKERS', 4))
+SEARCH_INDEX_BULK_THREADS = int(os.getenv('SEARCH_INDEX_BULK_THREADS', 4))
+# changed rows above which a startup sync does a full rebuild instead of a catch-up
+SEARCH_INDEX_MAX_INCREMENTAL = int(os.getenv('SEARCH_INDEX_MAX_INCREMENTAL', 5000))
+
+# "auto" serves search from elasticsearch while it is healthy and from the
+# database full-text backend otherwise; "elasticsearch" or "database" pins one
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+SEARCH_REQUEST_TIMEOUT = float(os.getenv('SEARCH_REQUEST_TIMEOUT', 2))
+SEARCH_HEALTHCHECK_TIMEOUT = float(os.getenv('SEARCH_HEALTHCHECK_TIMEOUT', 0.5))
+SEARCH_HEALTHCHECK_INTERVAL = float(os.getenv('SEARCH_HEALTHCHECK_INTERVAL', 10))
+
+SEARCH_FACET_SIZE = int(os.getenv('SEARCH_FACET_SIZE', 15))
+# boundaries of the price facet buckets, in naira
+SEARCH_PRICE_FACET_STEPS = [5000, 20000, 50000, 100000, 500000]
+
+# precomputed related products shown on the product page
+RELATED_PRODUCTS_TOP_K = int(os.getenv('RELATED_PRODUCTS_TOP_K', 10))
+RELATED_PRODUCTS_CHUNK_SIZE = int(os.getenv('RELATED_PRODUCTS_CHUNK_SIZE', 500))
+# tags on more live products than this say little about relatedness and are skipped
+RELATED_PRODUCTS_MAX_TAG_PRODUCTS = int(os.getenv('RELATED_PRODUCTS_MAX_TAG_PRODUCTS', 1000))
+
+# "frequently bought together", counted from paid orders in batches
+COPURCHASE_TOP_K = int(os.getenv('COPURCHASE_TOP_K', 10))
+COPURCHASE_ORDER_CHUNK_SIZE = int(os.getenv('COPURCHASE_ORDER_CHUNK_SIZE', 2000))
+# orders paid more recently are left for the next run, their transaction may not be committed yet
+COPURCHASE_SETTLE_SECONDS = int(os.getenv('COPURCHASE_SETTLE_SECONDS', 300))
+
+# text similarity index built nightly from TF-IDF vectors
+SIMILAR_PRODUCTS_TOP_K = int(os.getenv('SIMILAR_PRODUCTS_TOP_K', 10))
+# hashed vector width, memory is products x dimensions x 4 bytes
+SIMILAR_PRODUCTS_DIMENSIONS = int(os.getenv('SIMILAR_PRODUCTS_DIMENSIONS', 1024))
+SIMILAR_PRODUCTS_BLOCK_SIZE = int(os.getenv('SIMILAR_PRODUCTS_BLOCK_SIZE', 1024))
+SIMILAR_PRODUCTS_MIN_SCORE = float(os.getenv('SIMILAR_PRODUCTS_MIN_SCORE', 0.1))
+
+# precomputed product rankings (trending, best sellers) kept per scope
+RANKING_TOP_N = int(os.getenv('RANKING_TOP_N', 20))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 24))
+TRENDING_WINDOW_HOURS = int(os.getenv('TRENDING_WINDOW_HOURS', 24 * 7))
+TRENDING_PURCHASE_WEIGHT = float(os.getenv('TRENDING_PURCHASE_WEIGHT', 5))
+# days of sales re-aggregated on every rollup, covers late payments
+SALES_ROLLUP_LOOKBACK_DAYS = int(os.getenv('SALES_ROLLUP_LOOKBACK_DAYS', 2))
+
+# search events are buffered in memory, spooled to disk by a background
+# thread and loaded into SearchQueryLog by a periodic task
+SEARCH_ANALYTICS_ENABLED = (os.getenv('SEARCH_ANALYTICS_ENABLED') or 'true').lower() == 'true'
+SEARCH_ANALYTICS_SPOOL_DIR = os.getenv('SEARCH_ANALYTICS_SPOOL_DIR', str(BASE_DIR / 'var' / 'search-analytics'))
+SEARCH_ANALYTICS_FLUSH_INTERVAL = float(os.getenv('SEARCH_ANALYTICS_FLUSH_INTERVAL', 5))
+SEARCH_ANALYTICS_BUFFER_SIZE = int(os.getenv('SEARCH_ANALYTICS_BUFFER_SIZE', 10000))
+SEARCH_ANALYTICS_RETENTION_DAYS = int(os.getenv('SEARCH_ANALYTICS_RETENTION_DAYS', 90))
+
+# per-group limits for the header dropdown, all fetched in one _msearch
+SEARCH_HEADER_SIZES = {
+    'products': int(os.getenv('SEARCH_HEADER_PRODUCTS', 5)),
+    'categories': int(os.getenv('SEARCH_HEADER_CATEGORIES', 3)),
+    'brands': int(os.getenv('SEARCH_HEADER_BRANDS', 3)),
+    'vendors': int(os.getenv('SEARCH_HEADER_VENDORS', 3)),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -171,6 +233,39 @@ else:
 
 MEDIA_ROOT = str(BASE_DIR / 'media')
 
+# product images received by forms wait here until a worker sends them to
+# Cloudinary, so it must be shared by the web and worker containers
+MEDIA_SPOOL_DIR = os.getenv('MEDIA_SPOOL_DIR', str(BASE_DIR / 'var' / 'media-spool'))
+MEDIA_UPLOAD_WORKERS = int(os.getenv('MEDIA_UPLOAD_WORKERS', 4))
+# "cloudinary", or "local" to keep files under MEDIA_LOCAL_ROOT and run offline
+MEDIA_UPLOADER = os.getenv('MEDIA_UPLOADER', 'cloudinary')
+MEDIA_LOCAL_ROOT = os.getenv('MEDIA_LOCAL_ROOT', str(BASE_DIR / 'var' / 'media'))
+# images are resized to fit this many pixels and re-encoded ("webp" or "jpeg") before upload
+MEDIA_IMAGE_MAX_DIMENSION = int(os.getenv('MEDIA_IMAGE_MAX_DIMENSION', 2048))
+MEDIA_IMAGE_FORMAT = os.getenv('MEDIA_IMAGE_FORMAT', 'webp')
+MEDIA_IMAGE_QUALITY = int(os.getenv('MEDIA_IMAGE_QUALITY', 82))
+# uploads are read and sent in chunks of this size (Cloudinary needs at least
+# 5 MB per chunk), so a worker never holds a whole video in memory
+MEDIA_UPLOAD_CHUNK_SIZE = int(os.getenv('MEDIA_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+MEDIA_MAX_UPLOAD_SIZE = int(os.getenv('MEDIA_MAX_UPLOAD_SIZE', 100 * 1024 * 1024))
+# orphaned media collection (media.services.MediaGarbageCollector): the storage
+# folders swept, files deleted per Admin API batch and the pause between batches
+MEDIA_GC_FOLDERS = os.getenv(
+    'MEDIA_GC_FOLDERS', 'products,categories,sub_categories,banners,business_logo,id_card,profile_photo'
+).split(',')
+MEDIA_GC_BATCH_SIZE = int(os.getenv('MEDIA_GC_BATCH_SIZE', 100))
+MEDIA_GC_PAUSE_SECONDS = float(os.getenv('MEDIA_GC_PAUSE_SECONDS', 1))
+# files newer than this may be stored but not referenced yet
+MEDIA_GC_MIN_AGE_HOURS = int(os.getenv('MEDIA_GC_MIN_AGE_HOURS', 24))
+# soft deleted rows keep their files this long, so they can be restored
+MEDIA_GC_GRACE_DAYS = int(os.getenv('MEDIA_GC_GRACE_DAYS', 30))
+# files above FILE_UPLOAD_MAX_MEMORY_SIZE (2.5 MB) are streamed to a temporary file
+FILE_UPLOAD_HANDLERS = [
+    'media.upload_handlers.MaxSizeUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -1,4 +1,6 @@
 
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 import os
@@ -20,6 +22,10 @@ urlpatterns = [
     path('api/', include('api.urls')),
 ]
 
+if settings.MEDIA_UPLOADER == "local":
+    # files written by media.services.LocalUploader, static() only routes them when DEBUG is on
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_LOCAL_ROOT)
+
 
 handler404 = "crm.views.page_not_found"
 handler500 = "crm.views.server_error"
\ No newline at end of file
@@ -1,5 +1,5 @@
-import cloudinary
 from cloudinary.models import CloudinaryField
+from django.core.files import File
 from django.db import models
 from django.utils import timezone
 
@@ -10,9 +10,14 @@ class BannerTypeChoices(models.TextChoices):
 
 
 
+# the rows AvailableManager returns, also the condition of the partial
+# indexes serving available_objects queries
+LIVE = models.Q(deleted_at__isnull=True)
+
+
 class AvailableManager(models.Manager):
     def get_queryset(self):
-        return super(AvailableManager, self).get_queryset().filter(deleted_at__isnull=True)
+        return super(AvailableManager, self).get_queryset().filter(LIVE)
 
 class ObjectManager(models.Manager):
     def get_queryset(self):
@@ -26,6 +31,10 @@ class AppDbModel(models.Model):
         abstract = True
 
 
+# a field with nothing to compare against, as on a row not saved yet
+_MISSING = object()
+
+
 class BaseModel(AppDbModel):
 
     deleted_at = models.DateTimeField(null=True, blank=True)
@@ -48,6 +57,68 @@ class BaseModel(AppDbModel):
     class Meta:
         abstract = True
 
+    # change tracking: the values of ``tracked_fields`` as last loaded from
+    # or saved to the database, so save() overrides can tell what changed
+    # without a SELECT. Opt in per model, other rows carry no snapshot.
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if cls.tracked_fields:
+            instance._snapshot()
+        return instance
+
+    def _snapshot(self, fields=None):
+        if not self.tracked_fields:
+            return
+
+        names = self.tracked_fields
+        if fields is not None:
+            names = {self._meta.get_field(name).name for name in fields}.intersection(self.tracked_fields)
+
+        loaded = self.__dict__.setdefault("_loaded_values", {})
+        for name in names:
+            attname = self._meta.get_field(name).attname
+            # a deferred field was not loaded, it has nothing to compare against
+            if attname in self.__dict__:
+                loaded[attname] = self.__dict__[attname]
+
+    def _get_loaded_value(self, field):
+        if field.name not in self.tracked_fields:
+            raise ValueError(f"{type(self).__name__}.{field.name} is not in tracked_fields")
+
+        return self.__dict__.get("_loaded_values", {}).get(field.attname, _MISSING)
+
+    def previous(self, field):
+        """The value ``field`` was loaded with, None when there is none (a new row, deferred or built in code)"""
+        value = self._get_loaded_value(self._meta.get_field(field))
+        return None if value is _MISSING else value
+
+    def has_changed(self, field):
+        """Whether ``field`` differs from its loaded value, always True when there is none"""
+        field = self._meta.get_field(field)
+        previous = self._get_loaded_value(field)
+        if previous is _MISSING:
+            return True
+
+        # values set from form input may not be converted yet
+        return field.to_python(getattr(self, field.attname)) != previous
+
+    def save(self, *args, **kwargs):
+        # also on partial saves, it is the watermark SearchIndexService.sync
+        # catches the product, category, brand and vendor indices up from
+        self.updated_at = timezone.now()
+        if kwargs.get("update_fields"):
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at"}
+
+        super().save(*args, **kwargs)
+        self._snapshot(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot(fields)
+
 
 class ActivityLog(models.Model):
     user = models.ForeignKey(
@@ -91,16 +162,9 @@ class Banner(BaseModel):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            if self.image and not str(self.image).startswith("http"):
-                upload = cloudinary.uploader.upload(
-                    self.image,
-                    folder="banners",
-                    public_id=self.title.replace(" ", "_").lower(),
-                    overwrite=True,
-                    resource_type="image"
-                )
-                self.image = upload["public_id"]
+        if isinstance(self.image, File):
+            from media.services import MediaStore
+            self.image = MediaStore().put(self.image, folder="banners")
 
         super().save(*args, **kwargs)
 
@@ -3,6 +3,7 @@ from django.shortcuts import render
 from django.views import View
 
 from crm.models import Banner, BannerTypeChoices
+from media.services import get_media_url
 from products.services.product_service import ProductService
 from services.util import CustomRequestUtil
 
@@ -23,8 +24,8 @@ class HomeView(View, CustomRequestUtil):
 
         top_rated = product_service.fetch_list()[:10]
         new_arrivals = product_service.fetch_list()[:10]
-        best_seller = product_service.fetch_list().order_by("-quantity_sold")[:10]
-        trending_products = product_service.fetch_list().order_by("-views")[:5]
+        best_seller = product_service.get_best_sellers(limit=10)
+        trending_products = product_service.get_trending_products(limit=5)
         products = product_service.get_random_products(12)
         banners = Banner.objects.filter(is_active=True).order_by("?")
 
@@ -123,7 +124,7 @@ class BannerAPIView(View):
             'title': banner.title,
             'subtitle': banner.subtitle,
             'description': banner.description,
-            'image': banner.image.url if banner.image else '',
+            'image': get_media_url(banner.image),
             'discount_title': banner.discount_title,
             'discount_text': banner.discount_text,
             'banner_type': banner.banner_type,
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0006_mediaasset_stored_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
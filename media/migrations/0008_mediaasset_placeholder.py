@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0007_upload_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='placeholder',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
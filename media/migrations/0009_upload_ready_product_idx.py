@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0008_mediaasset_placeholder'),
+        ('products', '0026_live_partial_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='upload',
+            index=models.Index(condition=models.Q(('status', 'ready')), fields=['product'], name='upload_ready_product_idx'),
+        ),
+    ]
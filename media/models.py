@@ -1,32 +1,66 @@
-import cloudinary.uploader
 from cloudinary.models import CloudinaryField
+from django.core.files import File
 from django.db import models
 
 from crm.models import BaseModel
 
 
+class UploadStatus(models.TextChoices):
+    pending = "pending"
+    ready = "ready"
+    failed = "failed"
+
+
+class MediaAsset(models.Model):
+    """Every stored file by the SHA-256 of its bytes, so identical files are uploaded once"""
+    content_hash = models.CharField(max_length=64, unique=True)
+    public_id = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    # after media.services.ImageOptimizer, the dimensions are only set for images
+    stored_size = models.PositiveBigIntegerField(null=True, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    # a few pixels wide data URI shown while the image loads
+    placeholder = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.public_id
+
+
 class Upload(BaseModel):
     image = CloudinaryField("image", null=True, blank=True)
     product = models.ForeignKey(
         "products.Product", null=True, blank=True, on_delete=models.SET_NULL, related_name="product_media"
     )
+    # files received by a form wait in the local spool until
+    # media.tasks.process_uploads has stored them
+    status = models.CharField(max_length=20, choices=UploadStatus.choices, default=UploadStatus.ready)
+    spool_path = models.CharField(max_length=500, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    # transformation URLs and sizes from media.services.ResponsiveImageService
+    variants = models.JSONField(default=dict, blank=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status"], name="upload_status_idx"),
+            # the ready media prefetched with every product list
+            models.Index(
+                fields=["product"], condition=models.Q(status=UploadStatus.ready), name="upload_ready_product_idx"
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        if self.image and not str(self.image).startswith("http") and self.product:
-            # Count existing product images
-            count = Upload.objects.filter(product=self.product).count() + 1
-
-            upload = cloudinary.uploader.upload(
-                self.image,
-                folder=f"products/{self.product.sku}",   # products/<sku>/
-                public_id=str(count),                   # 1, 2, 3 ...
-                overwrite=True,
-                resource_type="image"
-            )
-            self.image = upload["public_id"]
+        # only a newly received file is sent, a stored image is just its public_id
+        if isinstance(self.image, File) and self.product:
+            from media.services import MediaStore
+            self.image = MediaStore().put(self.image, folder=f"products/{self.product.sku}")
+
+        public_id = str(self.image) if self.image else None
+        if public_id and self.variants.get("public_id") != public_id:
+            from media.services import ResponsiveImageService
+            self.variants = ResponsiveImageService().build_many([public_id])[public_id]
 
         super().save(*args, **kwargs)
 
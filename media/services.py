@@ -2,14 +2,31 @@ from django.core.files.base import ContentFile
 from django.utils.translation import gettext_lazy as _t
 import time
 import abc
+import base64
+import glob
+import hashlib
+import os
 import re
+import shutil
+import uuid
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO
+from pathlib import Path
 
 import cloudinary
+import cloudinary.api
 import cloudinary.uploader
+from cloudinary.models import CLOUDINARY_FIELD_DB_RE
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image, ImageOps, UnidentifiedImageError
 
-from media.models import Upload
+from media.models import Upload, UploadStatus
+from services.log import AppLogger
 from services.util import CustomRequestUtil
 
 
@@ -19,21 +36,11 @@ class FileUploader(CustomRequestUtil):
         self.upload_to = upload_to or "general"
         self.user = user or self.auth_user
 
-    def get_file_size(self, file):
-        original_position = file.tell()  # Store the original position
-        file.seek(0, 2)  # Move the file pointer to the end of the file
-        file_size = file.tell()  # Get the current position (file size)
-        file.seek(original_position)  # Return to the original position
-        return file_size
-
-    def generate_file_name(self, ext):
-        file_name = f"{str(time.time()).replace('.', '')}{str(time.time()).replace('.', '')}.{ext}"
-        return file_name
-
     def upload(self, file, media_type, product=None):
         original_file_name = file.name
         file_extension = original_file_name.split('.')[-1].lower()
-        file_size = self.get_file_size(file)
+        # known from the upload handlers, no need to seek through the file
+        file_size = file.size
 
         if not media_type:
             return None, _t("File type not found.")
@@ -50,43 +57,19 @@ class FileUploader(CustomRequestUtil):
 
         self.upload_to = media_type.upload_to
 
-        file_path = f"{self.upload_to}/{self.generate_file_name(file_extension)}"
-        file_content = ContentFile(file.read())
-
-        uploader = CloudinaryUploader(file_path, file_content, file_extension)
-
-        full_url = uploader.upload()
+        # deduplicated, optimized and streamed like the product images
+        public_id = MediaStore().put(file, folder=self.upload_to)
 
         uploaded_file = Upload.objects.create(
-            created_by=self.user,
-            file_url=full_url,
-            file_name=original_file_name.strip(f".{file_extension}"),
-            file_size=file_size,
-            file_type=self.get_content_type_from_extension(file_extension),
+            image=public_id,
             product=product,
-            user=self.user
+            status=UploadStatus.ready,
+            created_by=self.user
         )
 
         return uploaded_file, _t("File uploaded.")
 
 
-    def get_content_type_from_extension(self, file_extension):
-        extension_mapping = {
-            'txt': 'text/plain',
-            'jpg': 'image/jpeg',
-            'png': 'image/png',
-            'pdf': 'application/pdf',
-            'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            'mp4': 'video/mp4',
-            'mp3': 'audio/mp3',
-            'html': 'text/html',
-            'css': 'text/css',
-        }
-
-        return extension_mapping.get(file_extension, 'application/octet-stream')
-
-
 class Uploader:
     video_extensions = ["mp4", "mov", "avi"]
     image_extensions = ["jpg", "jpeg", "png", "gif"]
@@ -106,18 +89,17 @@ class Uploader:
     def delete(self):
         pass
 
+    @abc.abstractmethod
+    def get_url(self, **transformation):
+        pass
+
 
 class CloudinaryUploader(Uploader, ABC):
     def __init__(self, file_path=None, file_content=None, file_extension=None):
         super().__init__(file_path, file_content, file_extension)
 
-        # Configuration
-        cloudinary.config(
-            cloud_name=settings.CLOUDINARY_API_NAME,
-            api_key=settings.CLOUDINARY_API_KEY,
-            api_secret=settings.CLOUDINARY_API_SECRET,
-            secure=True
-        )
+        # Configuration, the credentials are set once in core.settings
+        cloudinary.config(secure=True)
 
     def upload(self):
         if self.file_extension in self.video_extensions:
@@ -129,17 +111,29 @@ class CloudinaryUploader(Uploader, ABC):
         else:
             resource_type = "image"
 
-        # Upload an image
-        upload_result = cloudinary.uploader.upload(
-            self.file_content,
-            public_id=self.file_path,
-            resource_type=resource_type
-        )
+        if isinstance(self.file_content, (str, os.PathLike)):
+            # sent in MEDIA_UPLOAD_CHUNK_SIZE parts, upload() would read the whole file into memory
+            upload_result = cloudinary.uploader.upload_large(
+                str(self.file_content),
+                public_id=self.file_path,
+                resource_type=resource_type,
+                chunk_size=settings.MEDIA_UPLOAD_CHUNK_SIZE,
+            )
+        else:
+            # Upload an image
+            upload_result = cloudinary.uploader.upload(
+                self.file_content,
+                public_id=self.file_path,
+                resource_type=resource_type
+            )
 
         url = upload_result.get("secure_url")
 
         return url
 
+    def get_url(self, **transformation):
+        return cloudinary.CloudinaryImage(self.file_path).build_url(secure=True, **transformation)
+
     def delete(self):
         match = re.search(r'upload/.*?/(.+?)(\.[^.]+)?$', self.file_path)
         if not match:
@@ -152,4 +146,648 @@ class CloudinaryUploader(Uploader, ABC):
 
         return True
 
+    def iter_resources(self, prefix):
+        """Yield every stored file under ``prefix``, listed a page of 500 at a time"""
+        for resource_type in ("image", "video", "raw"):
+            options = {"type": "upload", "resource_type": resource_type, "prefix": prefix, "max_results": 500}
+            while True:
+                page = cloudinary.api.resources(**options)
+                for resource in page.get("resources", []):
+                    yield {
+                        "public_id": resource["public_id"],
+                        "resource_type": resource_type,
+                        "bytes": resource.get("bytes") or 0,
+                        "created_at": parse_datetime(resource["created_at"]),
+                    }
+
+                if not page.get("next_cursor"):
+                    break
+                options["next_cursor"] = page["next_cursor"]
+
+    def delete_resources(self, resources):
+        """Delete a batch of files from iter_resources, 100 per Admin API call"""
+        by_type = {}
+        for resource in resources:
+            by_type.setdefault(resource["resource_type"], []).append(resource["public_id"])
+
+        for resource_type, public_ids in by_type.items():
+            for start in range(0, len(public_ids), 100):
+                cloudinary.api.delete_resources(
+                    public_ids[start:start + 100], resource_type=resource_type, type="upload"
+                )
+
+
+class LocalUploader(Uploader, ABC):
+    """
+    Same interface as CloudinaryUploader, storing files under
+    MEDIA_LOCAL_ROOT instead, so tests and development run offline
+    """
+
+    def get_path(self):
+        name = f"{self.file_path}.{self.file_extension}" if self.file_extension else self.file_path
+        return Path(settings.MEDIA_LOCAL_ROOT) / name
+
+    def upload(self):
+        path = self.get_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if isinstance(self.file_content, (str, os.PathLike)):
+            shutil.copyfile(self.file_content, path)
+        else:
+            self.file_content.seek(0)
+            with open(path, "wb") as destination:
+                shutil.copyfileobj(self.file_content, destination)
+
+        return f"{settings.MEDIA_URL}{path.relative_to(settings.MEDIA_LOCAL_ROOT).as_posix()}"
+
+    def get_url(self, **transformation):
+        # nothing transforms images offline, every variant is the stored file
+        root = Path(settings.MEDIA_LOCAL_ROOT)
+        path = next(root.glob(f"{glob.escape(self.file_path)}.*"), None) or root / self.file_path
+        return f"{settings.MEDIA_URL}{path.relative_to(root).as_posix()}"
+
+    def delete(self):
+        root = Path(settings.MEDIA_LOCAL_ROOT)
+        for path in root.glob(f"{self.file_path}.*"):
+            path.unlink(missing_ok=True)
+        (root / self.file_path).unlink(missing_ok=True)
+
+        return True
+
+    def iter_resources(self, prefix):
+        root = Path(settings.MEDIA_LOCAL_ROOT)
+        for path in sorted((root / prefix).rglob("*")):
+            if not path.is_file():
+                continue
+            stat = path.stat()
+            yield {
+                "public_id": path.relative_to(root).with_suffix("").as_posix(),
+                "resource_type": "image",
+                "bytes": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc),
+            }
+
+    def delete_resources(self, resources):
+        for resource in resources:
+            LocalUploader(resource["public_id"]).delete()
+
+
+UPLOADERS = {
+    "cloudinary": CloudinaryUploader,
+    "local": LocalUploader,
+}
+
+
+def get_media_url(image, **transformation):
+    """
+    The URL of a stored file, from a CloudinaryField value or a public_id,
+    built by the MEDIA_UPLOADER backend that stored it
+    """
+    if not image:
+        return ""
+
+    # stored values may be a bare public_id or "image/upload/v123/<public_id>.jpg"
+    public_id = re.match(CLOUDINARY_FIELD_DB_RE, str(image)).group("public_id")
+    return UPLOADERS[settings.MEDIA_UPLOADER](public_id).get_url(**transformation)
+
+
+class ImageOptimizer:
+    """
+    Shrinks images before they are stored: caps the longest side at
+    MEDIA_IMAGE_MAX_DIMENSION, drops EXIF (camera data, GPS) after applying
+    its rotation, and re-encodes to MEDIA_IMAGE_FORMAT at MEDIA_IMAGE_QUALITY.
+    Anything Pillow cannot open, and animated images, are left alone.
+
+    The same pass measures the image and makes its placeholder, a copy a few
+    pixels wide small enough to inline as a data URI while the image loads.
+    """
+
+    formats = {
+        "webp": ("WEBP", "webp", "image/webp"),
+        "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    }
+    placeholder_size = 16
+    placeholder_quality = 40
+
+    def __init__(self):
+        self.max_dimension = settings.MEDIA_IMAGE_MAX_DIMENSION
+        self.format, self.extension, self.content_type = self.formats[settings.MEDIA_IMAGE_FORMAT]
+        self.quality = settings.MEDIA_IMAGE_QUALITY
+
+    def convert(self, image):
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        if not has_alpha:
+            return image if image.mode == "RGB" else image.convert("RGB")
+
+        image = image.convert("RGBA")
+        if self.format == "WEBP":
+            return image
+
+        # JPEG has no alpha channel, flatten onto white
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+
+    def get_placeholder(self, image):
+        small = image.copy()
+        small.thumbnail((self.placeholder_size, self.placeholder_size), Image.Resampling.BILINEAR)
+
+        buffer = BytesIO()
+        small.save(buffer, self.format, quality=self.placeholder_quality)
+        return f"data:{self.content_type};base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+    def optimize(self, file):
+        """
+        Return ``(content, info)`` for a path or file object, content being a
+        ContentFile named with the new extension and info the ``width``,
+        ``height`` and ``placeholder`` of the image. Content is None when
+        re-encoding would only make the file larger, both are None when it is
+        not a still image.
+        """
+        is_path = isinstance(file, (str, os.PathLike))
+        name = file if is_path else getattr(file, "name", None) or "image"
+        if not is_path:
+            file.seek(0)
+
+        try:
+            with Image.open(file) as image:
+                if getattr(image, "is_animated", False):
+                    return None, None
+
+                original_size = os.path.getsize(file) if is_path else getattr(file, "size", None)
+                has_exif = bool(image.getexif())
+                icc_profile = image.info.get("icc_profile")
+
+                # JPEGs can be decoded straight at a reduced scale, much cheaper than a full decode
+                image.draft(image.mode, (self.max_dimension, self.max_dimension))
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((self.max_dimension, self.max_dimension), Image.Resampling.LANCZOS)
+                image = self.convert(image)
+
+                buffer = BytesIO()
+                options = {"quality": self.quality, "optimize": True}
+                if icc_profile:
+                    options["icc_profile"] = icc_profile
+                image.save(buffer, self.format, **options)
+                info = {"width": image.width, "height": image.height, "placeholder": self.get_placeholder(image)}
+        except UnidentifiedImageError:
+            return None, None
+        except (Image.DecompressionBombError, OSError) as e:
+            AppLogger.warning(f"Could not optimize {name}: {e}")
+            return None, None
+        finally:
+            if not is_path:
+                file.seek(0)
+
+        # a larger result is only kept when it is what removes the EXIF data
+        if original_size and buffer.tell() >= original_size and not has_exif:
+            return None, info
+
+        stem = os.path.splitext(os.path.basename(str(name)))[0]
+        return ContentFile(buffer.getvalue(), name=f"{stem}.{self.extension}"), info
+
+
+class MediaStore:
+    """
+    Content-addressed media. Files are named by the SHA-256 of their bytes
+    and MediaAsset remembers every hash already stored, so identical files
+    (the same photo on several products, a re-saved logo) are uploaded once
+    and then reused by public_id. The hash is of the file as received, so
+    a duplicate is recognised before ImageOptimizer spends time on it.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self):
+        self.uploader_class = UPLOADERS[settings.MEDIA_UPLOADER]
+        self.optimizer = ImageOptimizer()
+
+    def iter_chunks(self, file):
+        """Read a path or a (Django) file object in chunks, rewinding it afterwards"""
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "rb") as source:
+                yield from iter(lambda: source.read(self.chunk_size), b"")
+            return
+
+        file.seek(0)
+        if hasattr(file, "chunks"):
+            yield from file.chunks(self.chunk_size)
+        else:
+            yield from iter(lambda: file.read(self.chunk_size), b"")
+        file.seek(0)
+
+    def hash(self, file):
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in self.iter_chunks(file):
+            digest.update(chunk)
+            size += len(chunk)
+
+        return digest.hexdigest(), size
+
+    def get_extension(self, file):
+        name = file if isinstance(file, (str, os.PathLike)) else getattr(file, "name", None) or ""
+        return os.path.splitext(str(name))[1].lstrip(".").lower()
+
+    def get_public_id(self, digest, folder):
+        return f"{folder}/{digest}"
+
+    def find(self, digests):
+        """``{digest: public_id}`` of the hashes already stored"""
+        from media.models import MediaAsset
+
+        return dict(MediaAsset.objects.filter(content_hash__in=list(digests)).values_list("content_hash", "public_id"))
+
+    def prepare(self, file):
+        """
+        ``(file, info)`` to store in place of ``file``, info holding the width,
+        height and placeholder of images (empty otherwise). Anything that is not
+        re-encoded is passed on as a path when it is on disk, so the uploader
+        can stream it.
+        """
+        optimized, info = self.optimizer.optimize(file)
+        if optimized:
+            return optimized, info
+
+        if hasattr(file, "temporary_file_path"):
+            return file.temporary_file_path(), info or {}
+
+        return file, info or {}
+
+    def send(self, file, public_id):
+        """
+        Optimize and upload under ``public_id``, returns ``(public_id, stored_size,
+        info)``. No database access so it is safe in worker threads.
+        """
+        file, info = self.prepare(file)
+        stored_size = os.path.getsize(file) if isinstance(file, (str, os.PathLike)) else file.size
+        self.uploader_class(public_id, file, self.get_extension(file)).upload()
+
+        return public_id, stored_size, info
+
+    def register(self, digest, size, public_id, stored_size, info=None):
+        """Record a stored file, returns the public_id to use if another process registered it first"""
+        from media.models import MediaAsset
+
+        asset, created = MediaAsset.objects.get_or_create(content_hash=digest, defaults={
+            "public_id": public_id, "size": size, "stored_size": stored_size, **(info or {})
+        })
+        if created:
+            AppLogger.info(f"Stored {public_id}: {size} -> {stored_size} bytes, {size - stored_size} saved")
+
+        return asset.public_id
+
+    def put(self, file, folder):
+        """Store ``file`` unless identical bytes already are, returns its public_id"""
+        digest, size = self.hash(file)
+        public_id = self.find([digest]).get(digest)
+        if public_id:
+            return public_id
+
+        return self.register(digest, size, *self.send(file, self.get_public_id(digest, folder)))
+
+
+class ResponsiveImageService:
+    """
+    Builds the Cloudinary transformation URLs of an image once, when it is
+    stored, into ``Upload.variants``: the original plus a thumbnail, card
+    and detail width, each with its pixel size, the ``srcset`` joining them
+    and the inline placeholder. Templates (media_tags.responsive_image) and the search index then
+    only read that dict.
+    """
+
+    widths = {
+        "thumbnail": 160,
+        "card": 400,
+        "detail": 1000,
+    }
+
+    def get_url(self, public_id, **transformation):
+        return get_media_url(public_id, **transformation)
+
+    def get_size(self, width, height, max_width):
+        # crop "limit" only ever scales down
+        if not width or not height:
+            return None, None
+        scale = min(1, max_width / width)
+        return round(width * scale), round(height * scale)
+
+    def build(self, public_id, width=None, height=None, placeholder=""):
+        variants = {
+            "public_id": public_id,
+            "src": self.get_url(public_id),
+            "width": width,
+            "height": height,
+            "placeholder": placeholder,
+        }
+        for name, max_width in self.widths.items():
+            variant_width, variant_height = self.get_size(width, height, max_width)
+            variants[name] = {
+                "url": self.get_url(public_id, width=max_width, crop="limit", quality="auto", fetch_format="auto"),
+                "width": variant_width,
+                "height": variant_height,
+            }
+
+        # a variant as wide as the original adds nothing to the srcset
+        candidates = {}
+        for name in self.widths:
+            candidates.setdefault(variants[name]["width"] or self.widths[name], variants[name]["url"])
+        variants["srcset"] = ", ".join(f"{url} {w}w" for w, url in candidates.items())
+
+        return variants
+
+    def build_many(self, public_ids):
+        """``{public_id: variants}``, sizes and placeholders are taken from the stored MediaAssets"""
+        from media.models import MediaAsset
+
+        public_ids = set(filter(None, public_ids))
+        assets = {
+            asset["public_id"]: asset
+            for asset in MediaAsset.objects.filter(public_id__in=public_ids).values(
+                "public_id", "width", "height", "placeholder"
+            )
+        }
+
+        return {
+            public_id: self.build(public_id, **{
+                key: value for key, value in assets.get(public_id, {}).items() if key != "public_id"
+            })
+            for public_id in public_ids
+        }
 
+    def backfill(self, rebuild=False, batch_size=500):
+        """Fill the variants of stored uploads that have none (every upload with ``rebuild``), returns how many"""
+        uploads = Upload.objects.filter(status=UploadStatus.ready, image__isnull=False).exclude(image="")
+        if not rebuild:
+            uploads = uploads.filter(variants={})
+
+        updated = 0
+        product_ids = set()
+        batch = []
+        for upload in uploads.only("pk", "image", "product_id").iterator(chunk_size=batch_size):
+            batch.append(upload)
+            if len(batch) == batch_size:
+                updated += self.update(batch, product_ids)
+                batch = []
+        updated += self.update(batch, product_ids)
+
+        MediaIngestionService().reindex(product_ids)
+
+        return updated
+
+    def update(self, uploads, product_ids):
+        variants = self.build_many(str(upload.image) for upload in uploads)
+        for upload in uploads:
+            upload.variants = variants[str(upload.image)]
+            if upload.product_id:
+                product_ids.add(upload.product_id)
+
+        # bulk_update, Upload.save would build them one query at a time
+        Upload.objects.bulk_update(uploads, ["variants"])
+
+        return len(uploads)
+
+
+class MediaIngestionService:
+    """
+    Takes product images off the request thread. ``ingest`` only spools
+    the received files to local disk and creates pending Upload rows;
+    ``process`` (run by media.tasks.process_uploads) sends the files not
+    stored yet through MediaStore from a bounded thread pool and marks
+    them ready.
+    """
+
+    def __init__(self, user=None):
+        self.user = user
+        self.spool_dir = Path(settings.MEDIA_SPOOL_DIR)
+        self.workers = settings.MEDIA_UPLOAD_WORKERS
+        self.store = MediaStore()
+
+    def spool(self, file):
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        extension = os.path.splitext(file.name or "")[1].lower()
+        path = self.spool_dir / f"{uuid.uuid4().hex}{extension}"
+
+        with open(path, "wb") as destination:
+            for chunk in file.chunks():
+                destination.write(chunk)
+
+        return str(path)
+
+    def ingest(self, product, files):
+        """Spool ``files`` for ``product`` and queue their upload, returns the pending Uploads"""
+        from media.tasks import process_uploads
+
+        uploads = Upload.objects.bulk_create([
+            Upload(product=product, status=UploadStatus.pending, spool_path=self.spool(file), created_by=self.user)
+            for file in files
+        ])
+
+        upload_ids = [upload.pk for upload in uploads]
+        if upload_ids:
+            transaction.on_commit(lambda: process_uploads.delay(upload_ids))
+
+        return uploads
+
+    def send(self, upload, digest):
+        """Runs in a worker thread, so it must not touch the database"""
+        return self.store.send(upload.spool_path, self.store.get_public_id(digest, f"products/{upload.product.sku}"))
+
+    def process(self, upload_ids):
+        """Upload pending (or previously failed) spooled files, returns how many are ready"""
+        uploads = list(
+            Upload.objects.filter(
+                pk__in=upload_ids, status__in=[UploadStatus.pending, UploadStatus.failed], spool_path__isnull=False
+            ).select_related("product")
+        )
+        if not uploads:
+            return 0
+
+        hashes = {upload.pk: self.store.hash(upload.spool_path) for upload in uploads}
+        public_ids = self.store.find(digest for digest, _ in hashes.values())
+
+        # one upload per distinct file that is not stored yet
+        missing = {}
+        for upload in uploads:
+            digest, size = hashes[upload.pk]
+            if digest not in public_ids:
+                missing.setdefault(digest, (upload, size))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {digest: (pool.submit(self.send, upload, digest), size) for digest, (upload, size) in missing.items()}
+
+        errors = {}
+        for digest, (future, size) in futures.items():
+            try:
+                public_ids[digest] = self.store.register(digest, size, *future.result())
+            except Exception as e:
+                errors[digest] = e
+
+        variants = ResponsiveImageService().build_many(public_ids.values())
+
+        ready = []
+        for upload in uploads:
+            digest, _ = hashes[upload.pk]
+            if digest not in public_ids:
+                # the spooled file stays, so the upload can be retried
+                AppLogger.error(f"Failed to upload media {upload.pk}: {errors[digest]}")
+                Upload.objects.filter(pk=upload.pk).update(status=UploadStatus.failed, error=str(errors[digest]))
+                continue
+
+            # queryset update, Upload.save would send the image again
+            Upload.objects.filter(pk=upload.pk).update(
+                image=public_ids[digest], variants=variants[public_ids[digest]], status=UploadStatus.ready,
+                spool_path=None, error=None
+            )
+            Path(upload.spool_path).unlink(missing_ok=True)
+            ready.append(upload)
+
+        self.reindex({upload.product_id for upload in ready if upload.product_id})
+
+        return len(ready)
+
+    def reindex(self, product_ids):
+        # rows were updated without save(), so the search signals did not fire
+        if not product_ids or not getattr(settings, "ELASTICSEARCH_DSL_AUTOSYNC", True):
+            return
+
+        from products.services.search_index_service import SearchIndexService
+
+        service = SearchIndexService()
+        try:
+            service.populate(queryset=service.get_queryset().filter(pk__in=product_ids))
+        except Exception as e:
+            AppLogger.error(f"Failed to reindex products with new media: {e}")
+
+
+class MediaGarbageCollector:
+    """
+    Deletes stored files nothing refers to any more: images of deleted
+    uploads and products, replaced logos and covers. ``sweep`` lists the
+    MEDIA_GC_FOLDERS of the storage page by page, diffs them against the
+    public_ids of live rows and deletes the rest in batches of
+    MEDIA_GC_BATCH_SIZE, pausing MEDIA_GC_PAUSE_SECONDS between batches to
+    stay inside the Admin API rate limit.
+
+    Files younger than MEDIA_GC_MIN_AGE_HOURS are kept, they may be stored
+    but not referenced yet, and rows soft deleted less than
+    MEDIA_GC_GRACE_DAYS ago still count so they can be restored.
+    """
+
+    def __init__(self, dry_run=False, batch_size=None, pause=None):
+        self.dry_run = dry_run
+        self.batch_size = batch_size or settings.MEDIA_GC_BATCH_SIZE
+        self.pause = settings.MEDIA_GC_PAUSE_SECONDS if pause is None else pause
+        self.uploader = UPLOADERS[settings.MEDIA_UPLOADER]()
+        self.min_created_at = timezone.now() - timedelta(hours=settings.MEDIA_GC_MIN_AGE_HOURS)
+        self.deleted_before = timezone.now() - timedelta(days=settings.MEDIA_GC_GRACE_DAYS)
+
+    def get_public_id(self, value):
+        # stored values may be a bare public_id or "image/upload/v123/<public_id>.jpg"
+        if not value:
+            return None
+        return re.match(CLOUDINARY_FIELD_DB_RE, str(value)).group("public_id")
+
+    def get_sources(self):
+        """``(queryset, field)`` of every live row that can refer to a stored file"""
+        from django.db.models import Q
+
+        from accounts.models import VendorProfile
+        from crm.models import Banner
+        from products.models import Category, Subcategory
+
+        def live(prefix=""):
+            return Q(**{f"{prefix}deleted_at__isnull": True}) | Q(**{f"{prefix}deleted_at__gte": self.deleted_before})
+
+        uploads = Upload.objects.filter(live(), live("product__"), product__isnull=False)
+        return [
+            (uploads, "image"),
+            (Category.objects.filter(live()), "cover_image"),
+            (Subcategory.objects.filter(live()), "cover_image"),
+            (Banner.objects.filter(live()), "image"),
+            *((VendorProfile.objects.filter(live()), field) for field in ("business_logo", "id_card", "profile_photo")),
+        ]
+
+    def get_references(self, public_ids=None):
+        """The public_ids referred to, only checking ``public_ids`` when given"""
+        from django.db.models import Q
+
+        references = set()
+        for queryset, field in self.get_sources():
+            if public_ids is not None:
+                # rows may store "image/upload/v123/<public_id>.jpg", the values are normalized below
+                queryset = queryset.filter(
+                    Q(*(Q(**{f"{field}__contains": public_id}) for public_id in public_ids), _connector=Q.OR)
+                )
+            values = queryset.exclude(**{f"{field}__isnull": True}).exclude(**{field: ""}).values_list(field, flat=True)
+            references.update(self.get_public_id(value) for value in values.iterator(chunk_size=2000))
+
+        return references
+
+    def delete(self, resources, report):
+        """Delete a batch of orphaned files, unless a row started using one since the sweep began"""
+        from media.models import MediaAsset
+
+        if not resources:
+            return
+
+        referenced = self.get_references([resource["public_id"] for resource in resources])
+        resources = [resource for resource in resources if resource["public_id"] not in referenced]
+        if not resources:
+            return
+
+        # only the orphans' assets, so MediaStore stops handing those files out
+        MediaAsset.objects.filter(public_id__in=[resource["public_id"] for resource in resources]).delete()
+        self.uploader.delete_resources(resources)
+        report["deleted"] += len(resources)
+        report["deleted_bytes"] += sum(resource["bytes"] for resource in resources)
+
+        if self.pause:
+            time.sleep(self.pause)
+
+    def sweep(self, folders=None):
+        """
+        Returns a report per folder: files scanned, orphans found (count and
+        bytes) and orphans deleted, which stays 0 in a dry run.
+        """
+        references = self.get_references()
+        reports = {}
+
+        for folder in folders or settings.MEDIA_GC_FOLDERS:
+            report = reports[folder] = {
+                "scanned": 0, "scanned_bytes": 0, "orphaned": 0, "orphaned_bytes": 0, "deleted": 0, "deleted_bytes": 0
+            }
+            batch = []
+            for resource in self.uploader.iter_resources(f"{folder}/"):
+                report["scanned"] += 1
+                report["scanned_bytes"] += resource["bytes"]
+                if resource["public_id"] in references or resource["created_at"] > self.min_created_at:
+                    continue
+
+                report["orphaned"] += 1
+                report["orphaned_bytes"] += resource["bytes"]
+                if self.dry_run:
+                    continue
+
+                batch.append(resource)
+                if len(batch) >= self.batch_size:
+                    self.delete(batch, report)
+                    batch = []
+
+            if not self.dry_run:
+                self.delete(batch, report)
+
+            AppLogger.info(f"Media sweep of {folder}: {report}")
+
+        return reports
+
+    def release(self, public_ids, resource_type="image"):
+        """Delete files right away once the last row using them is gone, returns how many were deleted"""
+        report = {"deleted": 0, "deleted_bytes": 0}
+        public_ids = set(filter(None, map(self.get_public_id, public_ids)))
+        orphans = public_ids - self.get_references(public_ids)
+        self.delete([
+            {"public_id": public_id, "resource_type": resource_type, "bytes": 0} for public_id in orphans
+        ], report)
+
+        return report["deleted"]
@@ -0,0 +1,22 @@
+from celery import shared_task
+
+
+@shared_task
+def process_uploads(upload_ids):
+    from media.services import MediaIngestionService
+
+    return MediaIngestionService().process(upload_ids)
+
+
+@shared_task
+def release_media(public_ids):
+    from media.services import MediaGarbageCollector
+
+    return MediaGarbageCollector(pause=0).release(public_ids)
+
+
+@shared_task
+def collect_orphaned_media():
+    from media.services import MediaGarbageCollector
+
+    return MediaGarbageCollector().sweep()
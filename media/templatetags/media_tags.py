@@ -0,0 +1,84 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from media.services import get_media_url
+
+register = template.Library()
+
+# the width each variant is displayed at, for the browser to pick from the srcset
+SIZES = {
+    "thumbnail": "80px",
+    "card": "(max-width: 576px) 50vw, 220px",
+    "detail": "(max-width: 992px) 100vw, 50vw",
+}
+
+
+def get_variants(media):
+    if isinstance(media, dict):
+        return media.get("variants") or {}
+    return getattr(media, "variants", None) or {}
+
+
+def get_original_url(media):
+    # stored before variants existed, until build_image_variants has run.
+    # The search index already holds the URL, a model the stored file
+    if isinstance(media, dict):
+        return media.get("image") or ""
+    return get_media_url(getattr(media, "image", None))
+
+
+@register.simple_tag
+def responsive_image(media, variant="card", alt="", sizes=None, lazy=True, placeholder=None, **attrs):
+    """
+    Render an ``<img>`` of an Upload (or a product_media entry of the search
+    index) from its precomputed variants, e.g.
+    ``{% responsive_image first_media "card" alt=product.name class="img-fluid" %}``.
+    Extra keyword arguments become attributes, underscores turned into dashes.
+
+    Cards and detail images get the blurred placeholder as an inline
+    background until they load, thumbnails only with ``placeholder=True``.
+    """
+    variants = get_variants(media)
+    chosen = variants.get(variant, {})
+    src = chosen.get("url") or get_original_url(media)
+
+    if placeholder is None:
+        placeholder = variant != "thumbnail"
+    placeholder = variants.get("placeholder") if placeholder else None
+    if placeholder:
+        # removed once loaded, or it would show through transparent images
+        attrs["style"] = f"background: url({placeholder}) center / cover no-repeat; {attrs.get('style', '')}".strip()
+        attrs["onload"] = "this.style.removeProperty('background')"
+
+    attributes = {
+        "src": src,
+        "srcset": variants.get("srcset"),
+        "sizes": (sizes or SIZES[variant]) if variants else None,
+        "width": chosen.get("width"),
+        "height": chosen.get("height"),
+        "alt": alt,
+        "loading": "lazy" if lazy else None,
+        "decoding": "async",
+        **{name.replace("_", "-"): value for name, value in attrs.items()},
+    }
+
+    return format_html(
+        "<img {}>",
+        format_html_join(" ", '{}="{}"', ((name, value) for name, value in attributes.items() if value is not None)),
+    )
+
+
+@register.filter
+def media_url(image):
+    """The URL of a stored file from the configured uploader, ``{{ vendor.business_logo|media_url }}``"""
+    return get_media_url(image)
+
+
+@register.simple_tag
+def image_variant_url(media, variant="detail"):
+    """The URL of one variant, for attributes like data-zoom-image"""
+    variants = get_variants(media)
+    if not variants:
+        return get_original_url(media)
+
+    return variants["src"] if variant == "src" else variants[variant]["url"]
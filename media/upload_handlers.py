@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+from services.log import AppLogger
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """
+    Runs ahead of Django's own handlers and counts the bytes of each file as
+    they arrive, dropping a file as soon as it passes MEDIA_MAX_UPLOAD_SIZE
+    instead of after it has been written to a temporary file.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MEDIA_MAX_UPLOAD_SIZE:
+            AppLogger.warning(f"Skipped upload {self.file_name}, larger than {settings.MEDIA_MAX_UPLOAD_SIZE} bytes")
+            raise SkipFile()
+
+        return raw_data
+
+    def file_complete(self, file_size):
+        # the next handler builds the file
+        return None
@@ -1,13 +1,20 @@
 
+from django.db import transaction
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from .models import Upload
+from .tasks import release_media
 
 @require_http_methods(["DELETE"])
 def delete_product_image(request, upload_id):
     try:
         image = Upload.objects.get(id=upload_id)
+        public_id = str(image.image) if image.image else None
         image.delete()
+
+        # the file may be shared with other uploads, release_media only deletes it if not
+        if public_id:
+            transaction.on_commit(lambda: release_media.delay([public_id]))
         return JsonResponse({"success": True})
     except Upload.DoesNotExist:
         return JsonResponse({"success": False, "error": "Image not found"}, status=404)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:35
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_paid_at(apps, schema_editor):
+    # the successful verification is the closest record of when an order was paid
+    Order = apps.get_model("payments", "Order")
+    Transaction = apps.get_model("payments", "Transaction")
+
+    verified_at = Transaction._base_manager.filter(
+        order=OuterRef("pk"), status="success"
+    ).order_by("created_at").values("created_at")[:1]
+
+    Order._base_manager.filter(payment_status="Paid", paid_at__isnull=True).update(
+        paid_at=Coalesce(Subquery(verified_at), "created_at")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0013_alter_transaction_reference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_paid_at, migrations.RunPython.noop),
+    ]
@@ -47,6 +47,7 @@ class Order(BaseModel):
         choices=PaymentStatus.choices,
         default=PaymentStatus.processing
     )
+    paid_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     class Meta:
         ordering = ('-created_at',)
@@ -81,6 +82,9 @@ class OrderItem(BaseModel):
     estimated_delivery_date_down = models.DateField(null=True, blank=True)
     estimated_delivery_date_up = models.DateField(null=True, blank=True)
 
+    # shipped and delivered emails are sent on a status change
+    tracked_fields = ("status",)
+
     def __str__(self):
         return f'{self.order} - {self.product}'
 
@@ -99,21 +103,21 @@ class OrderItem(BaseModel):
                 self.ref = f"{order_ref}-ITM-{self.pk}"
 
         if self.pk is not None:
-            old_order_item = OrderItem.objects.get(pk=self.pk)
+            status_changed = self.has_changed("status")
 
             email_context = {
                 'customer_name': self.order.first_name,
-                'order_item' : old_order_item,
+                'order_item' : self,
             }
 
-            if old_order_item.status != self.status and self.status == OrderStatusChoices.shipped:
+            if status_changed and self.status == OrderStatusChoices.shipped:
                 self.order.update_overall_status()
 
                 send_email_notification.delay(
                     'emails/order-shipped.html', 'Order Shipped', self.order.email, email_context
                 )
 
-            if old_order_item.status != self.status and self.status == OrderStatusChoices.delivered:
+            if status_changed and self.status == OrderStatusChoices.delivered:
                 self.order.update_overall_status()
 
                 send_email_notification.delay(
@@ -4,9 +4,10 @@ from collections import defaultdict
 from datetime import datetime
 
 from django.core.paginator import Paginator
-from django.db.models import Q, Sum, Count
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
 
 from payments.models import Order, OrderItem
+from services.query import related_exists
 from services.util import CustomRequestUtil
 from crm.tasks import send_email_notification
 
@@ -54,7 +55,7 @@ class OrderService(CustomRequestUtil):
 
     def fetch_list(self, paginate=False):
 
-        orders = self.get_base_query().order_by('-created_at').distinct()
+        orders = self.get_base_query().order_by('-created_at')
 
         if paginate:
             paginator = Paginator(orders, 15)  # 25 items per page
@@ -72,14 +73,18 @@ class OrderService(CustomRequestUtil):
         if self.auth_user and not self.auth_vendor_profile:
             q &= Q(user=self.auth_user)
         if self.auth_vendor_profile:
-            q &= Q(items__product__created_by=self.auth_user)
+            q &= related_exists(Order, "items", product__created_by=self.auth_user)
 
         qs = Order.objects.filter(q).select_related("user").prefetch_related("items")
 
         if self.auth_vendor_profile:
+            # per order subqueries, a join to the items would need a GROUP BY over the whole order row
+            vendor_items = OrderItem.objects.filter(
+                order=OuterRef("pk"), product__created_by=self.auth_user
+            ).order_by().values("order")
             qs = qs.annotate(
-                items_count=Count('items', filter=Q(items__product__created_by=self.auth_user)),
-                total_value=Sum('items__price', filter=Q(items__product__created_by=self.auth_user))
+                items_count=Subquery(vendor_items.annotate(count=Count("pk")).values("count")),
+                total_value=Subquery(vendor_items.annotate(total=Sum("price")).values("total"))
             )
 
 
@@ -158,7 +163,7 @@ class OrderItemService(CustomRequestUtil):
     def fetch_list(self, paginate=False):
         q = Q()
 
-        order_items = self.get_base_query().filter(q).order_by('-created_at').distinct()
+        order_items = self.get_base_query().filter(q).order_by('-created_at')
 
         if paginate:
             paginator = Paginator(order_items, 25)  # 25 items per page
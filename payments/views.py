@@ -7,6 +7,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
+from django.utils import timezone
 
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
@@ -61,7 +62,8 @@ def paystack_verify_payment(request, order_id):
                 order.payment_status = PaymentStatus.paid
                 order.payment_method = payment_method
                 order.ref = reference
-                order.save(update_fields=["payment_status", "payment_method", "ref"])
+                order.paid_at = timezone.now()
+                order.save(update_fields=["payment_status", "payment_method", "ref", "paid_at"])
                 cart.clear()
                 del request.session['order_id']
 
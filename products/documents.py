@@ -1,10 +1,38 @@
+from django.db.models import Prefetch
 from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 
-from media.models import Upload
+from accounts.models import VendorProfile, VendorStatus
+from media.models import Upload, UploadStatus
+from media.services import get_media_url
 from .models import Product, Category, Subcategory, Brand, Tag
 
 
+AUTOCOMPLETE_INDEX_SETTINGS = {
+    'number_of_shards': 1,
+    'number_of_replicas': 0,
+    'analysis': {
+        'analyzer': {
+            'autocomplete_analyzer': {
+                'type': 'custom',
+                'tokenizer': 'edge_ngram_tokenizer',
+                'filter': [
+                    'lowercase'
+                ]
+            }
+        },
+        'tokenizer': {
+            'edge_ngram_tokenizer': {
+                'type': 'edge_ngram',
+                'min_gram': 2,
+                'max_gram': 20,
+                'token_chars': ['letter', 'digit']
+            }
+        }
+    }
+}
+
+
 @registry.register_document
 class ProductDocument(Document):
     """
@@ -23,7 +51,7 @@ class ProductDocument(Document):
     description = fields.TextField(analyzer='english')
     category = fields.ObjectField(properties={
         'id': fields.IntegerField(),
-        'name': fields.TextField(),
+        'name': fields.TextField(fields={'raw': fields.KeywordField()}),
     })
 
     sub_categories = fields.NestedField(properties={
@@ -33,17 +61,17 @@ class ProductDocument(Document):
 
     brand = fields.ObjectField(properties={
         'id': fields.IntegerField(),
-        'name': fields.TextField(),
+        'name': fields.TextField(fields={'raw': fields.KeywordField()}),
     })
 
     tags = fields.NestedField(properties={
         'id': fields.IntegerField(),
-        'name': fields.TextField(),
+        'name': fields.TextField(fields={'raw': fields.KeywordField()}),
     })
 
     colors = fields.NestedField(properties={
         'id': fields.IntegerField(),
-        'name': fields.TextField(),
+        'name': fields.TextField(fields={'raw': fields.KeywordField()}),
         'hex_code': fields.TextField(),
     })
 
@@ -51,6 +79,8 @@ class ProductDocument(Document):
     product_media = fields.NestedField(properties={
         'id': fields.IntegerField(),
         'image': fields.TextField(),  # store URL or string identifier
+        # precomputed srcset and variant URLs, stored but not searchable
+        'variants': fields.ObjectField(enabled=False),
     })
 
     discounted_price = fields.FloatField()
@@ -66,29 +96,7 @@ class ProductDocument(Document):
 
     class Index:
         name = 'products'
-        settings = {
-            'number_of_shards': 1,
-            'number_of_replicas': 0,
-            'analysis': {
-                'analyzer': {
-                    'autocomplete_analyzer': {
-                        'type': 'custom',
-                        'tokenizer': 'edge_ngram_tokenizer',
-                        'filter': [
-                            'lowercase'
-                        ]
-                    }
-                },
-                'tokenizer': {
-                    'edge_ngram_tokenizer': {
-                        'type': 'edge_ngram',
-                        'min_gram': 2,
-                        'max_gram': 20,
-                        'token_chars': ['letter', 'digit']
-                    }
-                }
-            }
-        }
+        settings = AUTOCOMPLETE_INDEX_SETTINGS
 
     class Django:
         model = Product
@@ -105,25 +113,40 @@ class ProductDocument(Document):
             'created_at',
             'updated_at',
         ]
-        related_models = [Category, Subcategory, Brand, Tag, Upload]
+        # taxonomy models are handled by products.signals, which refreshes
+        # only the embedded fields below in a background job
+        related_models = [Upload]
+        queryset_pagination = 1000
+
+    # related model -> (product lookup, embedded fields that depend on it)
+    related_fields = {
+        Category: ("category", ["category"]),
+        Subcategory: ("sub_categories", ["sub_categories"]),
+        Brand: ("brand", ["brand", "name_suggest"]),
+        Tag: ("tags", ["tags"]),
+    }
+
+    def get_queryset(self):
+        # load every relation the prepare_* methods touch up front so indexing
+        # does not issue a query per product for each of them
+        return super().get_queryset().select_related(
+            "category", "brand"
+        ).prefetch_related(
+            "tags", "colors", "sub_categories",
+            Prefetch("product_media", queryset=Upload.objects.filter(status=UploadStatus.ready)),
+        )
 
     def get_instances_from_related(self, related_instance):
         # when a related model changed, return products to re-index
-        if isinstance(related_instance, Category):
-            return related_instance.products.all()
-        if isinstance(related_instance, Subcategory):
-            return related_instance.products.all()
-        if isinstance(related_instance, Brand):
-            # brand may use product_set or related_name — adjust if different
-            return related_instance.product_set.all()
-        if isinstance(related_instance, Tag):
-            return related_instance.products.all()
         if isinstance(related_instance, Upload):
             # Upload has foreign key 'product' (nullable). Return that product if present
             if related_instance.product:
                 return [related_instance.product]
             return []
 
+    def prepare_partial(self, instance, field_names):
+        return {name: getattr(self, f"prepare_{name}")(instance) for name in field_names}
+
     def prepare_category(self, instance):
         if instance.category:
             return {'id': instance.category.id, 'name': instance.category.name}
@@ -147,29 +170,22 @@ class ProductDocument(Document):
         ]
 
     def prepare_discounted_price(self, instance):
-        if instance.percentage_discount:
-            discount = (instance.price * instance.percentage_discount) / 100
-            return float(instance.price - discount)
-        return float(instance.price)
+        return float(instance.effective_price)
 
     def prepare_product_media(self, instance):
         """
-        Return list of media dicts. Use Upload.image.url if available,
-        otherwise fall back to str(image) (CloudinaryField often stores public_id).
+        Return list of media dicts, with the URLs ResponsiveImageService built
+        when the image was stored. Uploads from before that keep the original
+        URL until build_image_variants has run.
         """
-        media = []
-        for up in instance.product_media.all():   # related_name on Upload model
-            # Try to get a usable URL:
-            url = None
-            try:
-                # many storage fields provide .url
-                url = up.image.url
-            except Exception:
-                # fallback to text repr (public_id) — client may need to construct final URL
-                url = str(up.image) if up.image else None
-
-            media.append({'id': up.id, 'image': url})
-        return media
+        return [
+            {
+                'id': up.id,
+                'image': up.variants.get('src') or get_media_url(up.image) or None,
+                'variants': up.variants,
+            }
+            for up in instance.product_media.all()  # related_name on Upload model
+        ]
 
     def prepare_name_suggest(self, instance):
         # add name and maybe slug, brand, etc for better suggestions
@@ -178,4 +194,60 @@ class ProductDocument(Document):
             inputs.append(instance.slug.replace('-', ' '))
         if instance.brand:
             inputs.append(instance.brand.name)
-        return {'input': inputs, 'weight': instance.stock or 1}
\ No newline at end of file
+        return {'input': inputs, 'weight': instance.stock or 1}
+
+
+class HeaderDocument(Document):
+    """
+    Base for the small documents shown next to products in the header search.
+    ``is_live`` lets queries skip soft-deleted rows that realtime updates
+    keep in the index.
+    """
+    name = fields.TextField(
+        analyzer='autocomplete_analyzer',
+        search_analyzer='standard',
+        fields={'raw': fields.KeywordField()}
+    )
+    is_live = fields.BooleanField()
+
+    def prepare_is_live(self, instance):
+        return instance.deleted_at is None
+
+
+@registry.register_document
+class CategoryDocument(HeaderDocument):
+    class Index:
+        name = 'categories'
+        settings = AUTOCOMPLETE_INDEX_SETTINGS
+
+    class Django:
+        model = Category
+        fields = ['id']
+
+
+@registry.register_document
+class BrandDocument(HeaderDocument):
+    class Index:
+        name = 'brands'
+        settings = AUTOCOMPLETE_INDEX_SETTINGS
+
+    class Django:
+        model = Brand
+        fields = ['id']
+
+
+@registry.register_document
+class VendorDocument(HeaderDocument):
+    class Index:
+        name = 'vendors'
+        settings = AUTOCOMPLETE_INDEX_SETTINGS
+
+    class Django:
+        model = VendorProfile
+        fields = ['id']
+
+    def prepare_name(self, instance):
+        return instance.store_name or instance.business_name or ""
+
+    def prepare_is_live(self, instance):
+        return instance.deleted_at is None and instance.status == VendorStatus.approved
@@ -0,0 +1,70 @@
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from products.services.similarity_service import SimilarityService
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the similar products build on synthetic catalogs and report its peak memory. "
+        "Nothing is read from or written to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[10000, 100000],
+            help="Catalog sizes to benchmark"
+        )
+        parser.add_argument(
+            "--vocabulary", type=int, default=20000,
+            help="Distinct words in the synthetic catalog"
+        )
+        parser.add_argument(
+            "--words", type=int, default=25,
+            help="Words per product description"
+        )
+        parser.add_argument("--dimensions", type=int, default=None)
+        parser.add_argument("--block-size", type=int, default=None)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def get_documents(self, size, options):
+        """Product texts with Zipf distributed words, like real catalog text"""
+        rng = np.random.default_rng(options["seed"])
+        words = np.minimum(rng.zipf(1.3, size=(size, options["words"] + 4)), options["vocabulary"])
+
+        return [
+            (product_id, " ".join(f"w{w}" for w in row[:4]), " ".join(f"w{w}" for w in row[4:]))
+            for product_id, row in enumerate(words.tolist(), start=1)
+        ]
+
+    def handle(self, *args, **options):
+        service = SimilarityService(dimensions=options["dimensions"], block_size=options["block_size"])
+        self.stdout.write(
+            f"top_k={service.top_k} dimensions={service.dimensions} block_size={service.block_size}"
+        )
+
+        for size in options["sizes"]:
+            documents = self.get_documents(size, options)
+
+            # numpy reports its buffers to tracemalloc, so the peak covers the matrices too
+            tracemalloc.start()
+            started = time.perf_counter()
+            ids, matrix = service.vectorize(documents)
+            vectorized = time.perf_counter()
+
+            neighbours = 0
+            for start, indices, scores in service.neighbours(matrix):
+                neighbours += int((scores >= service.min_score).sum())
+            finished = time.perf_counter()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{size:>8} products: vectorize {vectorized - started:.2f}s, "
+                f"neighbours {finished - vectorized:.2f}s, "
+                f"matrix {matrix.nbytes / 2 ** 20:.0f} MiB, peak {peak / 2 ** 20:.0f} MiB, "
+                f"{neighbours} neighbours kept"
+            ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from media.services import ResponsiveImageService
+
+
+class Command(BaseCommand):
+    help = "Precompute the responsive image variants (srcset URLs and sizes) of stored product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Rebuild every upload, e.g. after changing ResponsiveImageService.widths"
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        updated = ResponsiveImageService().backfill(rebuild=options["rebuild"], batch_size=options["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(f"Built image variants for {updated} uploads"))
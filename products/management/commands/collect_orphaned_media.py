@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from media.services import MediaGarbageCollector
+
+
+class Command(BaseCommand):
+    help = "Delete stored media files no upload, category, banner or vendor profile refers to any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report the orphaned files and their size"
+        )
+        parser.add_argument(
+            "--folder", action="append", default=None,
+            help="Storage folder to sweep, repeat for several (default MEDIA_GC_FOLDERS)"
+        )
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--pause", type=float, default=None,
+            help="Seconds to wait between delete batches"
+        )
+
+    def format_size(self, size):
+        for unit in ("B", "KiB", "MiB"):
+            if size < 1024:
+                return f"{size:.0f} {unit}"
+            size /= 1024
+        return f"{size:.1f} GiB"
+
+    def handle(self, *args, **options):
+        collector = MediaGarbageCollector(
+            dry_run=options["dry_run"], batch_size=options["batch_size"], pause=options["pause"]
+        )
+        reports = collector.sweep(folders=options["folder"])
+
+        self.stdout.write(f"{'folder':<20} {'scanned':>10} {'orphaned':>10} {'orphaned size':>14} {'deleted':>10}")
+        for folder, report in reports.items():
+            self.stdout.write(
+                f"{folder:<20} {report['scanned']:>10} {report['orphaned']:>10} "
+                f"{self.format_size(report['orphaned_bytes']):>14} {report['deleted']:>10}"
+            )
+
+        orphaned = sum(report["orphaned"] for report in reports.values())
+        orphaned_bytes = sum(report["orphaned_bytes"] for report in reports.values())
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(
+                f"Dry run, {orphaned} orphaned files ({self.format_size(orphaned_bytes)}) would be deleted"
+            ))
+        else:
+            deleted = sum(report["deleted"] for report in reports.values())
+            self.stdout.write(self.style.SUCCESS(
+                f"Deleted {deleted} of {orphaned} orphaned files ({self.format_size(orphaned_bytes)})"
+            ))
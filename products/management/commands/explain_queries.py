@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from accounts.models import VendorProfile, VendorStatus
+from media.models import Upload, UploadStatus
+from payments.models import Order
+from products.models import Product, ProductReview, Subcategory
+from products.services.product_service import ProductService
+from services.query import related_exists
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the EXPLAIN plans of the main product, vendor and review queries. With --compare, "
+        "also the plans without the partial indexes, dropped inside a rolled back transaction, "
+        "which only a DEBUG (development) database allows."
+    )
+
+    models = [Product, Subcategory, ProductReview, VendorProfile, Upload]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--compare", action="store_true",
+            help="Also show the plans without the partial indexes, needs --allow-ddl and DEBUG"
+        )
+        parser.add_argument(
+            "--allow-ddl", action="store_true",
+            help="Allow --compare to drop the indexes, which locks the tables until the rollback"
+        )
+        parser.add_argument(
+            "--analyze", action="store_true",
+            help="Run the queries and show actual timings (PostgreSQL only)"
+        )
+        parser.add_argument("--query", default=None, help="Only explain queries whose title contains this")
+
+    def get_partial_indexes(self):
+        return [(model, index) for model in self.models for index in model._meta.indexes if index.condition is not None]
+
+    def get_queries(self):
+        product = Product.available_objects.exclude(category=None).exclude(created_by=None).order_by("pk").first()
+        product = product or Product(pk=0, category_id=0, created_by_id=0, slug="")
+        base = ProductService(None).get_base_query()
+        page_ids = list(Product.available_objects.order_by("rating").values_list("pk", flat=True)[:25])
+
+        return [
+            ("Product list", base[:25]),
+            ("Category listing", base.filter(category_id=product.category_id)[:25]),
+            ("Vendor products", base.filter(created_by_id=product.created_by_id)[:25]),
+            ("Subcategory listing", ProductService(None).fetch_list(subcategory="-")[:25]),
+            ("Vendor product count", Product.available_objects.filter(created_by_id=product.created_by_id).values("pk")),
+            ("Trending fallback", base.order_by("-views")[:5]),
+            ("Best-seller fallback", base.order_by("-quantity_sold")[:10]),
+            ("Newest products", Product.available_objects.order_by("-created_at")[:10]),
+            ("Product by slug", base.filter(slug=product.slug)),
+            ("Subcategories of a category", Subcategory.available_objects.filter(category_id=product.category_id)),
+            ("Vendor orders", Order.objects.filter(related_exists(Order, "items", product__created_by_id=product.created_by_id))),
+            ("Approved vendors", VendorProfile.available_objects.filter(status=VendorStatus.approved)),
+            ("Media of a product page", Upload.objects.filter(status=UploadStatus.ready, product_id__in=page_ids)),
+            (
+                "Rating breakdown",
+                ProductReview.available_objects.filter(product_id=product.pk).values("rating").annotate(count=Count("id")),
+            ),
+        ]
+
+    def explain(self, queries, options):
+        explain_options = {"analyze": True} if options["analyze"] else {}
+        for title, queryset in queries:
+            self.stdout.write(self.style.MIGRATE_LABEL(f"\n{title}"))
+            for line in queryset.explain(**explain_options).splitlines():
+                self.stdout.write(f"  {line}")
+
+    def handle(self, *args, **options):
+        # DROP INDEX takes an exclusive lock on the table until the rollback,
+        # blocking every read and write of a live database meanwhile
+        if options["compare"] and not (options["allow_ddl"] and settings.DEBUG):
+            raise CommandError("--compare drops indexes, it needs --allow-ddl and a DEBUG (development) database")
+
+        if options["analyze"] and connection.vendor != "postgresql":
+            self.stderr.write("--analyze is only supported on PostgreSQL, showing plans without it")
+            options["analyze"] = False
+
+        queries = self.get_queries()
+        if options["query"]:
+            queries = [(title, queryset) for title, queryset in queries if options["query"].lower() in title.lower()]
+
+        if options["compare"]:
+            self.stdout.write(self.style.MIGRATE_HEADING("Before: without the partial indexes"))
+            # DDL is transactional on PostgreSQL and SQLite, the rollback puts the indexes back
+            with transaction.atomic():
+                quote = connection.ops.quote_name
+                with connection.cursor() as cursor:
+                    for model, index in self.get_partial_indexes():
+                        cursor.execute(connection.SchemaEditorClass.sql_delete_index % {
+                            "table": quote(model._meta.db_table), "name": quote(index.name)
+                        })
+
+                self.explain(queries, options)
+                transaction.set_rollback(True)
+
+            self.stdout.write("")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("After: with the partial indexes"))
+        self.explain(queries, options)
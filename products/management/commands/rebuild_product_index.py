@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.documents import ProductDocument, CategoryDocument, BrandDocument, VendorDocument
+from products.services.search_index_service import SearchIndexService
+
+DOCUMENTS = {
+    document._index._name: document
+    for document in (ProductDocument, CategoryDocument, BrandDocument, VendorDocument)
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild a search index (products by default) into a new versioned index with streamed, "
+        "parallel bulk indexing, then atomically point the alias at it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--index", choices=sorted(DOCUMENTS), default=ProductDocument._index._name,
+            help="Alias of the index to rebuild"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=None,
+            help="Rows fetched (and prefetched) from the database per chunk"
+        )
+        parser.add_argument(
+            "--bulk-chunk-size", type=int, default=None,
+            help="Documents sent to elasticsearch per bulk request"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Threads used to build documents"
+        )
+        parser.add_argument(
+            "--thread-count", type=int, default=None,
+            help="Threads used by parallel_bulk to send requests"
+        )
+        parser.add_argument(
+            "--keep-old", action="store_true",
+            help="Keep the previously live index instead of deleting it after the swap"
+        )
+
+    def handle(self, *args, **options):
+        service = SearchIndexService(
+            document=DOCUMENTS[options["index"]],
+            chunk_size=options["chunk_size"],
+            bulk_chunk_size=options["bulk_chunk_size"],
+            workers=options["workers"],
+            thread_count=options["thread_count"],
+        )
+
+        self.stdout.write(
+            f"Rebuilding '{service.alias}' "
+            f"(chunk={service.chunk_size}, bulk={service.bulk_chunk_size}, "
+            f"workers={service.workers}, threads={service.thread_count})"
+        )
+
+        index_name, error = service.rebuild(keep_old=options["keep_old"])
+
+        for line in service.report.as_lines():
+            self.stdout.write(line)
+
+        if error:
+            raise CommandError(f"Rebuild aborted, '{service.alias}' was left unchanged: {error}")
+
+        self.stdout.write(self.style.SUCCESS(f"'{service.alias}' now points to '{index_name}'"))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.services.related_products_service import RelatedProductsService
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed related products of every product."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top-k", type=int, default=None,
+            help="Related products kept per product"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=None,
+            help="Products computed and written per batch"
+        )
+
+    def handle(self, *args, **options):
+        service = RelatedProductsService(top_k=options["top_k"], chunk_size=options["chunk_size"])
+
+        started = time.perf_counter()
+        computed = service.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed related products for {computed} products in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.services.similarity_service import SimilarityService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the TF-IDF similar products index of every product."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top-k", type=int, default=None,
+            help="Similar products kept per product"
+        )
+        parser.add_argument(
+            "--dimensions", type=int, default=None,
+            help="Width of the hashed TF-IDF vectors"
+        )
+        parser.add_argument(
+            "--block-size", type=int, default=None,
+            help="Rows scored against each other per matrix product"
+        )
+
+    def handle(self, *args, **options):
+        service = SimilarityService(
+            top_k=options["top_k"], dimensions=options["dimensions"], block_size=options["block_size"]
+        )
+
+        started = time.perf_counter()
+        computed = service.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed similar products for {computed} products in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from products.services.best_seller_service import BestSellerService, SalesRollupService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollup and the 7 and 30 day best-seller rankings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=30,
+            help="Days of paid orders re-aggregated, use a large value to backfill"
+        )
+
+    def handle(self, *args, **options):
+        rows = SalesRollupService().rollup(days=options["days"])
+        self.stdout.write(f"Stored {rows} daily sales rows")
+
+        for days in (7, 30):
+            stored = BestSellerService(days=days).refresh()
+            self.stdout.write(self.style.SUCCESS(f"Ranked {stored} best-seller entries over {days} days"))
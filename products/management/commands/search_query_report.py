@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from products.services.search_analytics_service import SearchAnalyticsService
+
+
+class Command(BaseCommand):
+    help = "Report the most frequent searches, searches returning nothing and search latency percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=7,
+            help="How many days of searches to report on"
+        )
+        parser.add_argument(
+            "--limit", type=int, default=20,
+            help="Rows shown in each query table"
+        )
+        parser.add_argument(
+            "--kind", default=None,
+            choices=["search", "autocomplete", "faceted_search", "header_search"],
+            help="Only report this kind of search"
+        )
+
+    def handle(self, *args, **options):
+        service = SearchAnalyticsService()
+        queryset = service.get_queryset(days=options["days"], kind=options["kind"])
+
+        total = queryset.count()
+        self.stdout.write(f"{total} searches in the last {options['days']} days")
+        if not total:
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nTop queries"))
+        for row in service.top_queries(queryset, limit=options["limit"]):
+            self.stdout.write(f"  {row['searches']:>8}  {row['query']}  ({row['zero_results']} with no results)")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nZero-result queries"))
+        for row in service.zero_result_queries(queryset, limit=options["limit"]):
+            self.stdout.write(f"  {row['searches']:>8}  {row['query']}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nLatency (ms)"))
+        for label, field in (("end-to-end", "latency_ms"), ("elasticsearch took", "took_ms")):
+            points = service.percentiles(queryset, field)
+            values = "  ".join(
+                f"p{point}={value if value is not None else '-'}" for point, value in points.items()
+            )
+            self.stdout.write(f"  {label:<20}{values}")
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.documents import ProductDocument, CategoryDocument, BrandDocument, VendorDocument
+from products.services.search_index_service import SearchIndexService
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the product, category, brand and vendor search indices up to date. "
+        "Each one is left alone when its mapping and "
+        "database high-water mark are unchanged, catches up a few changed rows "
+        "incrementally, and only rebuilds when the mapping changed or too much did."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-incremental", type=int, default=None,
+            help="Most changed rows to catch up incrementally before falling back to a rebuild"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=None,
+            help="Rows fetched (and prefetched) from the database per chunk"
+        )
+        parser.add_argument(
+            "--bulk-chunk-size", type=int, default=None,
+            help="Documents sent to elasticsearch per bulk request"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Threads used to build documents"
+        )
+        parser.add_argument(
+            "--thread-count", type=int, default=None,
+            help="Threads used by parallel_bulk to send requests"
+        )
+
+    def handle(self, *args, **options):
+        failed = []
+
+        for document in (ProductDocument, CategoryDocument, BrandDocument, VendorDocument):
+            service = SearchIndexService(
+                document=document,
+                chunk_size=options["chunk_size"],
+                bulk_chunk_size=options["bulk_chunk_size"],
+                workers=options["workers"],
+                thread_count=options["thread_count"],
+            )
+
+            action, error = service.sync(max_incremental=options["max_incremental"])
+
+            if action == "skipped":
+                self.stdout.write(self.style.SUCCESS(f"'{service.alias}' is current, nothing to do"))
+                continue
+
+            for line in service.report.as_lines():
+                self.stdout.write(line)
+
+            if error:
+                self.stderr.write(f"'{service.alias}' sync ({action}) failed: {error}")
+                failed.append(service.alias)
+                continue
+
+            self.stdout.write(self.style.SUCCESS(f"'{service.alias}' {action}"))
+
+        if failed:
+            raise CommandError(f"Search index sync failed for: {', '.join(failed)}")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.services.copurchase_service import CoPurchaseService
+
+
+class Command(BaseCommand):
+    help = "Count the orders paid since the last run into the frequently bought together lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Forget the stored counts and recount every paid order"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=None,
+            help="Orders counted and written per batch"
+        )
+
+    def handle(self, *args, **options):
+        service = CoPurchaseService(chunk_size=options["chunk_size"])
+
+        started = time.perf_counter()
+        processed = service.rebuild() if options["rebuild"] else service.run()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Counted {processed} orders in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,112 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:13
+
+import django.db.models.deletion
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+
+FTS_TABLE = "products_productsearchtext_fts"
+GIN_INDEX = "product_search_text_gin"
+
+
+def search_vector():
+    # must stay identical to products.search_backends.search_vector
+    return (
+        SearchVector("name", weight="A", config="english")
+        + SearchVector("body", weight="B", config="english")
+    )
+
+
+def create_search_indexes(apps, schema_editor):
+    ProductSearchText = apps.get_model("products", "ProductSearchText")
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "postgresql":
+        schema_editor.add_index(ProductSearchText, GinIndex(search_vector(), name=GIN_INDEX))
+
+    elif vendor == "sqlite":
+        table = ProductSearchText._meta.db_table
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"name, body, content='{table}', content_rowid='product_id')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, name, body) VALUES (new.product_id, new.name, new.body); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, body) "
+            f"VALUES ('delete', old.product_id, old.name, old.body); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, body) "
+            f"VALUES ('delete', old.product_id, old.name, old.body); "
+            f"INSERT INTO {FTS_TABLE}(rowid, name, body) VALUES (new.product_id, new.name, new.body); END"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    ProductSearchText = apps.get_model("products", "ProductSearchText")
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "postgresql":
+        schema_editor.remove_index(ProductSearchText, GinIndex(search_vector(), name=GIN_INDEX))
+
+    elif vendor == "sqlite":
+        table = ProductSearchText._meta.db_table
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def backfill_search_text(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductSearchText = apps.get_model("products", "ProductSearchText")
+
+    products = Product._base_manager.select_related("category", "brand").prefetch_related(
+        "tags", "sub_categories"
+    ).order_by("pk")
+
+    batch = []
+    for product in products.iterator(chunk_size=500):
+        parts = [
+            strip_tags(product.short_description or ""),
+            strip_tags(product.description or ""),
+            product.category.name if product.category else "",
+            product.brand.name if product.brand else "",
+            " ".join(tag.name for tag in product.tags.all()),
+            " ".join(sub.name for sub in product.sub_categories.all()),
+        ]
+        batch.append(ProductSearchText(
+            product_id=product.pk, name=product.name, body=" ".join(part for part in parts if part)
+        ))
+
+        if len(batch) >= 500:
+            ProductSearchText._base_manager.bulk_create(batch)
+            batch = []
+
+    ProductSearchText._base_manager.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_product_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchText',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_text', serialize=False, to='products.product')),
+                ('name', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+    ]
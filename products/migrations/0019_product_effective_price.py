@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:22
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_effective_price(apps, schema_editor):
+    # same rule as Product.get_effective_price, historical models have no methods
+    Product = apps.get_model("products", "Product")
+    now = timezone.now()
+
+    batch = []
+    for product in Product._base_manager.only(
+        "price", "percentage_discount", "add_product_to_sales", "sale_start", "sale_end"
+    ).iterator(chunk_size=1000):
+        price = product.price or Decimal(0)
+        discount = product.percentage_discount
+        effective_price = price
+        if discount and discount > 0:
+            closed = (
+                product.add_product_to_sales and product.sale_start and product.sale_end
+                and not product.sale_start <= now <= product.sale_end
+            )
+            if not closed:
+                effective_price = (price - price * discount / 100).quantize(Decimal("0.01"))
+
+        product.effective_price = effective_price
+        batch.append(product)
+        if len(batch) >= 1000:
+            Product._base_manager.bulk_update(batch, ["effective_price"])
+            batch = []
+
+    Product._base_manager.bulk_update(batch, ["effective_price"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0005_alter_banner_banner_type'),
+        ('products', '0018_searchquerylog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price'], name='product_effective_price_idx'),
+        ),
+        migrations.RunPython(backfill_effective_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_sale_state(apps, schema_editor):
+    # mirrors Product.get_sale_state and SaleScheduleService.schedule,
+    # historical models have no methods
+    Product = apps.get_model("products", "Product")
+    ProductSaleTransition = apps.get_model("products", "ProductSaleTransition")
+    now = timezone.now()
+
+    products = Product._base_manager.filter(sale_start__isnull=False, sale_end__isnull=False)
+    batch, transitions = [], []
+    for product in products.only("sale_start", "sale_end").iterator(chunk_size=1000):
+        if now < product.sale_start:
+            product.sale_state = "upcoming"
+            transitions.append(ProductSaleTransition(product_id=product.pk, run_at=product.sale_start, state="active"))
+        elif now <= product.sale_end:
+            product.sale_state = "active"
+        else:
+            product.sale_state = "ended"
+        if product.sale_end > now:
+            transitions.append(ProductSaleTransition(product_id=product.pk, run_at=product.sale_end, state="ended"))
+        batch.append(product)
+
+    Product._base_manager.bulk_update(batch, ["sale_state"], batch_size=1000)
+    ProductSaleTransition._base_manager.bulk_create(transitions, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sale_state',
+            field=models.CharField(choices=[('no_sale', 'No Sale'), ('upcoming', 'Upcoming'), ('active', 'Active'), ('ended', 'Ended')], default='no_sale', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ProductSaleTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_at', models.DateTimeField()),
+                ('state', models.CharField(choices=[('no_sale', 'No Sale'), ('upcoming', 'Upcoming'), ('active', 'Active'), ('ended', 'Ended')], max_length=20)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_transitions', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['run_at'], name='sale_transition_run_at_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_sale_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0020_product_sale_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAssociation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('related', 'Related')], max_length=20)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='associated_from', to='products.product')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='associations', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'other'], name='product_association_other_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'product', 'rank'), name='product_association_rank_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_productassociation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('purchases', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='product_activity_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'bucket'), name='product_activity_bucket_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('trending', 'Trending')], max_length=20)),
+                ('scope', models.CharField(choices=[('site', 'Site'), ('category', 'Category'), ('vendor', 'Vendor')], max_length=20)),
+                ('scope_id', models.PositiveIntegerField(default=0)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='products.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'scope', 'scope_id', 'rank'), name='product_ranking_rank_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0022_productactivity_productranking'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productranking',
+            name='kind',
+            field=models.CharField(choices=[('trending', 'Trending'), ('best_seller_7d', 'Best Seller 7D'), ('best_seller_30d', 'Best Seller 30D')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ProductSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='product_sales_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='product_sales_daily_uniq')],
+            },
+        ),
+    ]
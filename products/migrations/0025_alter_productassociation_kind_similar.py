@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0024_copurchasecount_batchwatermark'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productassociation',
+            name='kind',
+            field=models.CharField(choices=[('related', 'Related'), ('copurchase', 'Copurchase'), ('similar', 'Similar')], max_length=20),
+        ),
+    ]
@@ -1,13 +1,14 @@
 import uuid
+from decimal import Decimal
 
-import cloudinary
 from cloudinary.models import CloudinaryField
+from django.core.files import File
 from django.db import models
 from django.utils import timezone
 from django.utils.text import slugify
 
 from accounts.models import User
-from crm.models import BaseModel, Color
+from crm.models import LIVE, BaseModel, Color
 from products.services.product_service import generate_sku
 
 
@@ -21,15 +22,9 @@ class Category(BaseModel):
     cover_image = CloudinaryField("image", null=True, blank=True)
 
     def save(self, *args, **kwargs):
-        if self.cover_image and not str(self.cover_image).startswith("http"):
-            upload = cloudinary.uploader.upload(
-                self.cover_image,
-                folder="categories",
-                public_id=self.name.replace(" ", "_").lower(),
-                overwrite=True,
-                resource_type="image"
-            )
-            self.cover_image = upload["public_id"]
+        if isinstance(self.cover_image, File):
+            from media.services import MediaStore
+            self.cover_image = MediaStore().put(self.cover_image, folder="categories")
 
         super().save(*args, **kwargs)
 
@@ -48,15 +43,9 @@ class Subcategory(BaseModel):
     cover_image = CloudinaryField("image", null=True, blank=True)
 
     def save(self, *args, **kwargs):
-        if self.cover_image and not str(self.cover_image).startswith("http"):
-            upload = cloudinary.uploader.upload(
-                self.cover_image,
-                folder="sub_categories",
-                public_id=self.name.replace(" ", "_").lower(),
-                overwrite=True,
-                resource_type="image"
-            )
-            self.cover_image = upload["public_id"]
+        if isinstance(self.cover_image, File):
+            from media.services import MediaStore
+            self.cover_image = MediaStore().put(self.cover_image, folder="sub_categories")
 
         super().save(*args, **kwargs)
 
@@ -65,6 +54,9 @@ class Subcategory(BaseModel):
 
     class Meta:
         verbose_name_plural = "subcategories"
+        indexes = [
+            models.Index(fields=["category"], condition=LIVE, name="subcategory_live_category_idx"),
+        ]
 
 
 class Tag(BaseModel):
@@ -81,6 +73,17 @@ class Brand(BaseModel):
         return self.name
 
 
+class SaleState(models.TextChoices):
+    no_sale = "no_sale"
+    upcoming = "upcoming"
+    active = "active"
+    ended = "ended"
+
+
+# fields that feed Product.effective_price and Product.sale_state
+PRICE_FIELDS = {"price", "percentage_discount", "add_product_to_sales", "sale_start", "sale_end"}
+
+
 class Product(BaseModel):
     name = models.CharField(max_length=255)
     slug = models.SlugField(unique=True, blank=True)
@@ -90,6 +93,9 @@ class Product(BaseModel):
 
     price = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     percentage_discount = models.IntegerField(null=True, blank=True)
+    # what a customer pays right now, kept in sync by save() and by
+    # products.tasks.apply_sale_transitions as sale windows open and close
+    effective_price = models.DecimalField(max_digits=15, decimal_places=2, default=0)
 
     sku = models.CharField(max_length=255, blank=True, null=True, unique=True)
     description = models.TextField(null=True, blank=True)
@@ -104,6 +110,9 @@ class Product(BaseModel):
     add_product_to_sales = models.BooleanField(default=False)
     sale_start = models.DateTimeField(null=True, blank=True)
     sale_end = models.DateTimeField(null=True, blank=True)
+    # precomputed from the sale window, moved along by the transitions in
+    # ProductSaleTransition rather than evaluated per request
+    sale_state = models.CharField(max_length=20, choices=SaleState.choices, default=SaleState.no_sale)
 
 
     weight = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -115,6 +124,24 @@ class Product(BaseModel):
     views = models.PositiveIntegerField(default=0)
     quantity_sold = models.PositiveIntegerField(default=0)
 
+    # the slug follows the name, the related products lists the category
+    tracked_fields = ("name", "category")
+
+    class Meta:
+        indexes = [
+            # high-water mark used to check whether the search index is current
+            models.Index(fields=["updated_at"], name="product_updated_at_idx"),
+            models.Index(fields=["effective_price"], name="product_effective_price_idx"),
+            # partial indexes on the live rows, the ones available_objects reads,
+            # for its hot filters and orderings (the slug is already unique)
+            models.Index(fields=["category", "rating"], condition=LIVE, name="product_live_category_idx"),
+            models.Index(fields=["created_by", "rating"], condition=LIVE, name="product_live_vendor_idx"),
+            models.Index(fields=["rating"], condition=LIVE, name="product_live_rating_idx"),
+            models.Index(fields=["-views"], condition=LIVE, name="product_live_views_idx"),
+            models.Index(fields=["-quantity_sold"], condition=LIVE, name="product_live_sold_idx"),
+            models.Index(fields=["-created_at"], condition=LIVE, name="product_live_created_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -127,37 +154,255 @@ class Product(BaseModel):
         if not self.sku and self.name:
             self.sku = generate_sku(self.name)
 
-        if self.pk:
-            old_name = Product.objects.filter(pk=self.pk).values_list("name", flat=True).first()
-        else:
-            old_name = None
-
-        if not self.slug or (old_name and old_name != self.name):
+        if not self.slug or (self.previous("name") and self.has_changed("name")):
             unique_id = str(uuid.uuid4())[:8]
             self.slug = f"{slugify(self.name)}-{unique_id}"
 
+        self.sale_state = self.get_sale_state()
+        self.effective_price = self.get_effective_price()
+
+        # updated_at is set by BaseModel.save
+        update_fields = kwargs.get("update_fields")
+        reschedule = update_fields is None or bool(PRICE_FIELDS.intersection(update_fields))
+        if update_fields and reschedule:
+            kwargs["update_fields"] = {*update_fields, "effective_price", "sale_state"}
+
         super().save(*args, **kwargs)
 
+        if reschedule:
+            from products.services.sale_schedule_service import SaleScheduleService
+            SaleScheduleService().schedule(self)
+
+    def get_sale_window(self):
+        """sale_start and sale_end as aware datetimes, even if still raw form input"""
+        window = []
+        for name in ("sale_start", "sale_end"):
+            value = self._meta.get_field(name).to_python(getattr(self, name))
+            if value and timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            window.append(value)
+
+        return window
+
+    def get_sale_state(self, now=None):
+        sale_start, sale_end = self.get_sale_window()
+        now = now or timezone.now()
+
+        if not sale_start or not sale_end:
+            return SaleState.no_sale
+        elif now < sale_start:
+            return SaleState.upcoming
+        elif sale_start <= now <= sale_end:
+            return SaleState.active
+        else:
+            return SaleState.ended
+
+    def get_effective_price(self):
+        """
+        The discount applies at all times, except for products put on sale
+        with a window, which only get it while that window is open.
+        """
+        # values may still be raw form input at this point
+        price = self._meta.get_field("price").to_python(self.price) or Decimal(0)
+        discount = self._meta.get_field("percentage_discount").to_python(self.percentage_discount)
+        if not discount or discount <= 0:
+            return price
+
+        on_sale = self._meta.get_field("add_product_to_sales").to_python(self.add_product_to_sales)
+        if on_sale and self.get_sale_state() in (SaleState.upcoming, SaleState.ended):
+            return price
+
+        return (price - price * discount / 100).quantize(Decimal("0.01"))
+
     @property
     def is_on_sale(self):
-        now = timezone.now()
-        return (
-                self.sale_start
-                and self.sale_end
-                and self.sale_start <= now <= self.sale_end
-        )
+        return self.sale_state == SaleState.active
 
     @property
     def sale_status(self):
-        now = timezone.now()
-        if not self.sale_start or not self.sale_end:
-            return "no_sale"
-        elif now < self.sale_start:
-            return "upcoming"  # sale not started yet
-        elif self.sale_start <= now <= self.sale_end:
-            return "active"  # sale running
-        else:
-            return "ended"  # sale finished
+        return self.sale_state
+
+
+class ProductSaleTransition(models.Model):
+    """
+    A future sale_start or sale_end of a product, queued so the scheduler
+    only touches products whose sale state is actually due to change.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="sale_transitions")
+    run_at = models.DateTimeField()
+    state = models.CharField(max_length=20, choices=SaleState.choices)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["run_at"], name="sale_transition_run_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.state} at {self.run_at}"
+
+
+class AssociationKind(models.TextChoices):
+    related = "related"
+    copurchase = "copurchase"
+    similar = "similar"
+
+
+class ProductAssociation(models.Model):
+    """
+    Precomputed top-K lists of products associated with a product, one list
+    per kind, read in rank order on the product page.
+    """
+    kind = models.CharField(max_length=20, choices=AssociationKind.choices)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="associations")
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="associated_from")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "product", "rank"], name="product_association_rank_uniq"),
+        ]
+        indexes = [
+            # finds the lists that mention a product when it changes
+            models.Index(fields=["kind", "other"], name="product_association_other_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.product_id} -> {self.other_id} (#{self.rank})"
+
+
+class CoPurchaseCount(models.Model):
+    """
+    Sparse item-item co-occurrence counts over paid orders, stored in both
+    directions. The diagonal row (product == other) counts the orders that
+    contain the product at all.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "other"], name="copurchase_pair_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} + {self.other_id}: {self.orders}"
+
+
+class BatchWatermark(models.Model):
+    """How far a batch job has consumed its input, so the next run only reads newer rows"""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class ProductActivity(models.Model):
+    """Views and purchases of a product per hour, the input of the trending score"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="activity")
+    bucket = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+    purchases = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "bucket"], name="product_activity_bucket_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["bucket"], name="product_activity_bucket_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.bucket}: {self.views} views, {self.purchases} purchases"
+
+
+class ProductSalesDaily(models.Model):
+    """Units and revenue of paid order items per product per day"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="daily_sales")
+    day = models.DateField()
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "day"], name="product_sales_daily_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["day"], name="product_sales_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.units}"
+
+
+class RankingKind(models.TextChoices):
+    trending = "trending"
+    best_seller_7d = "best_seller_7d"
+    best_seller_30d = "best_seller_30d"
+
+
+class RankingScope(models.TextChoices):
+    site = "site"
+    category = "category"
+    vendor = "vendor"
+
+
+class ProductRanking(models.Model):
+    """
+    Precomputed top-N product lists per kind and scope, e.g. trending in a
+    category. ``scope_id`` is the category or vendor user id, 0 site-wide.
+    """
+    kind = models.CharField(max_length=20, choices=RankingKind.choices)
+    scope = models.CharField(max_length=20, choices=RankingScope.choices)
+    scope_id = models.PositiveIntegerField(default=0)
+    rank = models.PositiveSmallIntegerField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="rankings")
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "scope", "scope_id", "rank"], name="product_ranking_rank_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}/{self.scope}/{self.scope_id} #{self.rank}: {self.product_id}"
+
+
+class ProductSearchText(models.Model):
+    """
+    Denormalised product text searched by the database search backend when
+    Elasticsearch is unavailable. Full-text indexed with GIN on PostgreSQL and
+    mirrored into an FTS5 table by triggers on SQLite (see migration 0017).
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="search_text"
+    )
+    name = models.CharField(max_length=255)
+    body = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return self.name
+
+
+class SearchQueryLog(models.Model):
+    """
+    One row per recorded search. Rows are written in batches by
+    products.tasks.ingest_search_queries, never from the request itself.
+    """
+    kind = models.CharField(max_length=20)  # ProductSearch method
+    query = models.CharField(max_length=255, db_index=True)
+    filters = models.JSONField(null=True, blank=True)
+    hits = models.PositiveIntegerField(default=0)
+    took_ms = models.PositiveIntegerField(null=True, blank=True)
+    latency_ms = models.PositiveIntegerField()
+    backend = models.CharField(max_length=20)
+    created_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.kind}: {self.query}"
 
 
 class ProductVariant(models.Model):
@@ -179,6 +424,11 @@ class ProductReview(BaseModel):
     rating = models.IntegerField(null=True, blank=True)
     review = models.CharField(max_length=500, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "rating"], condition=LIVE, name="review_live_product_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.first_name}'s Review on {self.product}"
 
@@ -1,57 +1,50 @@
-from elasticsearch_dsl import Q
-from .documents import ProductDocument
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.urls import reverse
+
+from .search_analytics import recorder
+from .search_backends import run_search
+
+
+def run_recorded_search(method, query, *args, **kwargs):
+    """Run a search and buffer its query, hit count and timings for analytics"""
+    stats = {}
+    started = time.perf_counter()
+    result = run_search(method, query, *args, stats=stats, **kwargs)
+
+    recorder.record(
+        kind=method,
+        query=query,
+        filters=kwargs.get("filters"),
+        hits=stats["total"] or 0,
+        took_ms=stats["took"],
+        latency_ms=round((time.perf_counter() - started) * 1000),
+        backend=stats["backend"],
+    )
+
+    return result
 
 
 class ProductSearch:
-    """Handle product search operations"""
+    """
+    Handle product search operations.
+
+    Each call is served by the healthiest available backend: Elasticsearch
+    when its index is up, otherwise the database full-text backend.
+    """
 
     @staticmethod
-    def search_products(query=None):
+    def search_products(query=None, size=10):
         """
         Advanced product search with filters
 
         Args:
             query: Search query string
-            category: Category ID or name
-            brand: Brand ID or name
-            min_price: Minimum price filter
-            max_price: Maximum price filter
-            tags: List of tag names
-            in_stock: Boolean to filter in-stock products
-            sort_by: Sort option ('relevance', 'price_asc', 'price_desc', 'newest')
-            page: Page number
-            page_size: Items per page
+            size: Number of results to return
         """
-        s = ProductDocument.search()
-
-        # Text search query
-        if query:
-            s = s.query(
-                'multi_match',
-                query=query,
-                fields=[
-                    'name^3',  # Boost name field
-                    'description^2',
-                    'short_description',
-                    'brand.name',
-                    'category.name',
-                    'tags.name',
-                ],
-                fuzziness='AUTO'
-            )
-
-        # Execute search
-        response = s.execute()
-
-
-        return [
-            {
-                'text': hit.name,
-                'score': hit.meta.score,
-                'product': hit.to_dict()
-            }
-            for hit in response.hits
-        ]
+        return run_recorded_search("search", query, size=size)
 
     @staticmethod
     def autocomplete(query, size=10):
@@ -62,54 +55,100 @@ class ProductSearch:
             query: Partial search term
             size: Number of suggestions to return
         """
-        s = ProductDocument.search()
-        s = s.query(
-            'match',
-            name__suggest=query
-        )[:size]
-
-        s = s.query(
-            'bool',
-            should=[
-                {'match': {'name__suggest': {'query': query, 'boost': 2}}},
-                {'prefix': {'name.raw': {'value': query.lower(), 'boost': 3}}}
-            ],
-            minimum_should_match=1
+        return run_recorded_search("autocomplete", query, size=size)
+
+    @staticmethod
+    def similar_products(product_id, size=5):
+        """
+        Products with the most similar text, read from the index built
+        nightly by SimilarityService. Products not indexed yet fall back to
+        the backend's live query (More Like This on Elasticsearch).
+
+        Args:
+            product_id: ID of the product to find similar items for
+            size: Number of similar products to return
+        """
+        from .documents import ProductDocument
+        from .models import AssociationKind, ProductAssociation
+
+        other_ids = list(
+            ProductAssociation.objects.filter(
+                kind=AssociationKind.similar, product_id=product_id
+            ).order_by("rank").values_list("other_id", flat=True)[:size]
         )
+        if not other_ids:
+            return run_search("similar", product_id, size=size)
 
-        response = s.execute()
-        # suggestions = response.suggest.product_suggestions[0].options
+        document = ProductDocument()
+        products = document.get_queryset().filter(pk__in=other_ids, deleted_at__isnull=True).in_bulk()
 
-        return [
-            {
-                'text': hit.name,
-                'score': hit.meta.score,
-                'product': hit.to_dict()
-            }
-            for hit in response.hits
-        ]
+        return [document.prepare(products[pk]) for pk in other_ids if pk in products]
 
+    @staticmethod
+    def faceted_search(query=None, filters=None, size=10):
+        """
+        Search results and facet counts computed in the same request
 
+        Args:
+            query: Search query string
+            filters: Active facet filters (category, subcategory, brand,
+                tags, colors, min_price, max_price)
+            size: Number of results to return, 0 for facets only
+        """
+        filters = filters or {}
+        response = run_recorded_search("faceted_search", query, filters=filters, size=size)
+        ProductSearch.link_facets(response["facets"], query, filters)
+
+        return response
 
     @staticmethod
-    def similar_products(product_id, size=5):
+    def facets(filters=None):
+        """Facet counts for a listing page"""
+        return ProductSearch.faceted_search(filters=filters, size=0)["facets"]
+
+    @staticmethod
+    def link_facets(facets, query, filters):
+        """Give every facet bucket the search url that narrows to it"""
+
+        def url(**changes):
+            params = {"q": query, **filters, **changes}
+            params = {
+                key: ",".join(value) if isinstance(value, list) else value
+                for key, value in params.items() if value not in (None, "", [])
+            }
+            return f"{reverse('search')}?{urlencode(params)}"
+
+        for bucket in facets.get("categories", []):
+            bucket["url"] = url(category=bucket["name"])
+        for bucket in facets.get("brands", []):
+            bucket["url"] = url(brand=bucket["name"])
+        for group in ("colors", "tags"):
+            selected = filters.get(group) or []
+            for bucket in facets.get(group, []):
+                values = selected if bucket["name"] in selected else [*selected, bucket["name"]]
+                bucket["url"] = url(**{group: values})
+        for bucket in facets.get("price", []):
+            bucket["url"] = url(min_price=bucket["from"], max_price=bucket["to"])
+
+        return facets
+
+    @staticmethod
+    def header_search(query, sizes=None):
         """
-        Find similar products using More Like This query
+        Grouped results for the header search box in a single round-trip
 
         Args:
-            product_id: ID of the product to find similar items for
-            size: Number of similar products to return
+            query: Partial search term
+            sizes: Per-group result limits, defaults to SEARCH_HEADER_SIZES
         """
-        s = ProductDocument.search()
-        s = s.query(
-            'more_like_this',
-            fields=['name', 'description', 'category.name', 'tags.name'],
-            like=[{'_id': product_id}],
-            min_term_freq=1,
-            max_query_terms=12
-        )
-        s = s[:size]
+        sizes = {**settings.SEARCH_HEADER_SIZES, **(sizes or {})}
+        results = run_recorded_search("header_search", query, sizes)
 
-        response = s.execute()
-        return [hit.to_dict() for hit in response]
+        for category in results.get("categories", []):
+            category["url"] = reverse("shop-by-category", args=[category["name"]])
+        for brand in results.get("brands", []):
+            brand["url"] = f"{reverse('search')}?{urlencode({'q': brand['name']})}"
+        for vendor in results.get("vendors", []):
+            vendor["url"] = reverse("vendor-store", args=[vendor["id"]])
 
+        return results
@@ -0,0 +1,164 @@
+"""
+Search query analytics.
+
+``recorder.record`` only appends to an in-process buffer. A daemon thread
+drains that buffer every SEARCH_ANALYTICS_FLUSH_INTERVAL seconds into an
+append-only JSONL spool file, and ``products.tasks.ingest_search_queries``
+later loads finished spool files into SearchQueryLog in bulk, so a search
+request never waits on a write.
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from services.log import AppLogger
+
+
+SPOOL_PREFIX = "queries-"
+SPOOL_MINUTE_FORMAT = "%Y%m%d%H%M"
+# a spool file being ingested is renamed to this suffix first, so no two
+# workers read the same file
+CLAIM_SUFFIX = ".processing"
+# a claim this old belongs to a worker that died mid ingest
+STALE_CLAIM_AGE = timedelta(hours=1)
+
+
+def normalize_query(query):
+    return re.sub(r"\s+", " ", (query or "").strip().lower())[:255]
+
+
+class SearchQueryRecorder:
+    """Buffers search events per process and spools them to disk in batches"""
+
+    def __init__(self):
+        # bounded so a stuck flusher drops the oldest events instead of
+        # growing without limit
+        self.buffer = deque(maxlen=settings.SEARCH_ANALYTICS_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def spool_dir(self):
+        return Path(settings.SEARCH_ANALYTICS_SPOOL_DIR)
+
+    def record(self, kind, query, hits, latency_ms, backend, took_ms=None, filters=None):
+        if not settings.SEARCH_ANALYTICS_ENABLED or not query:
+            return
+
+        # deque.append is atomic, nothing here blocks the request
+        self.buffer.append({
+            "kind": kind,
+            "query": normalize_query(query),
+            "filters": filters or None,
+            "hits": hits,
+            "took_ms": took_ms,
+            "latency_ms": latency_ms,
+            "backend": backend,
+            "created_at": timezone.now().isoformat(),
+        })
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        # web servers fork after import, so the thread is started lazily and
+        # again in every child process
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="search-analytics", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(settings.SEARCH_ANALYTICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                AppLogger.error(f"Failed to spool search analytics: {e}")
+
+    def drain(self):
+        events = []
+        while True:
+            try:
+                events.append(self.buffer.popleft())
+            except IndexError:
+                return events
+
+    def spool_path(self):
+        # one file per process and minute, so a file stops growing once its
+        # minute is over and can be ingested without coordination
+        minute = timezone.now().strftime(SPOOL_MINUTE_FORMAT)
+        return self.spool_dir / f"{SPOOL_PREFIX}{minute}-{os.getpid()}.jsonl"
+
+    def flush(self):
+        events = self.drain()
+        if not events:
+            return 0
+
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.spool_path(), "a", encoding="utf-8") as spool:
+            spool.write("".join(json.dumps(event, default=str) + "\n" for event in events))
+
+        return len(events)
+
+
+def claim_spool_file(path):
+    """Atomically take a spool file for this worker, None when another one was first"""
+    claimed = path.with_suffix(CLAIM_SUFFIX)
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return None
+
+    # the claim time, which release_stale_claims goes by
+    os.utime(claimed)
+    return claimed
+
+
+def release_stale_claims(spool_dir):
+    """Put files claimed by a worker that never finished back in line"""
+    cutoff = time.time() - STALE_CLAIM_AGE.total_seconds()
+    for path in spool_dir.glob(f"{SPOOL_PREFIX}*{CLAIM_SUFFIX}"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                os.rename(path, path.with_suffix(".jsonl"))
+        except FileNotFoundError:
+            # released or finished by another worker meanwhile
+            continue
+
+
+def get_ready_spool_files():
+    """Spool files whose minute has fully passed, oldest first"""
+    spool_dir = Path(settings.SEARCH_ANALYTICS_SPOOL_DIR)
+    if not spool_dir.exists():
+        return []
+
+    release_stale_claims(spool_dir)
+
+    # one minute of slack covers a flush that began just before the boundary
+    cutoff = (timezone.now() - timedelta(minutes=1)).strftime(SPOOL_MINUTE_FORMAT)
+    ready = []
+    for path in spool_dir.glob(f"{SPOOL_PREFIX}*.jsonl"):
+        minute = path.name[len(SPOOL_PREFIX):].split("-", 1)[0]
+        if minute < cutoff:
+            ready.append(path)
+
+    return sorted(ready)
+
+
+recorder = SearchQueryRecorder()
@@ -0,0 +1,556 @@
+import re
+import time
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Q as DjangoQ, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils.html import strip_tags
+from elasticsearch_dsl import MultiSearch, Q, connections
+
+from services.log import AppLogger
+from services.query import related_exists
+from .documents import ProductDocument, CategoryDocument, BrandDocument, VendorDocument
+
+
+SEARCH_TEXT_FIELDS = {"name", "short_description", "description", "category", "brand"}
+
+
+def search_vector():
+    # must stay identical to the expression indexed in migration 0017
+    return (
+        SearchVector("name", weight="A", config="english")
+        + SearchVector("body", weight="B", config="english")
+    )
+
+
+def build_search_body(product):
+    parts = [
+        strip_tags(product.short_description or ""),
+        strip_tags(product.description or ""),
+        product.category.name if product.category else "",
+        product.brand.name if product.brand else "",
+        " ".join(tag.name for tag in product.tags.all()),
+        " ".join(sub.name for sub in product.sub_categories.all()),
+    ]
+    return " ".join(part for part in parts if part)
+
+
+class SearchBackend:
+    """Interface implemented by every product search backend"""
+
+    name = None
+
+    # set by the last call when the backend knows them: server side time
+    # in ms and total matches (beyond the returned page)
+    took = None
+    total = None
+
+    def is_available(self):
+        raise NotImplementedError
+
+    def mark_unavailable(self):
+        pass
+
+    def search(self, query=None, size=10):
+        raise NotImplementedError
+
+    def autocomplete(self, query, size=10):
+        raise NotImplementedError
+
+    def similar(self, product_id, size=5):
+        raise NotImplementedError
+
+    def faceted_search(self, query=None, filters=None, size=10):
+        """
+        Matching products plus facet counts for the same filters.
+
+        ``filters`` may hold ``category`` and ``brand`` (id or name),
+        ``subcategory``, ``tags``, ``colors``, ``min_price``, ``max_price``
+        and ``in_stock``. Returns
+        ``{'results': [...], 'facets': {...}}`` where facets maps categories,
+        brands, colors and tags to ``[{'name', 'count'}]`` and price to
+        ``[{'from', 'to', 'count'}]``. ``size=0`` only computes facets.
+        """
+        raise NotImplementedError
+
+    def header_search(self, query, sizes):
+        """
+        Product suggestions plus matching categories, brands and vendors.
+
+        ``sizes`` maps each group to its result limit, groups not in it are
+        skipped. Returns ``{group: [...]}`` with products shaped like
+        ``autocomplete`` and the others as ``{'id', 'name'}``.
+        """
+        raise NotImplementedError
+
+    def index_products(self, product_ids):
+        """Bring the backend's copy of these products up to date"""
+
+    def remove_products(self, product_ids):
+        """Drop these products from the backend"""
+
+
+class ElasticsearchBackend(SearchBackend):
+    name = "elasticsearch"
+
+    # health is shared by every instance in the process and re-checked at most
+    # once per SEARCH_HEALTHCHECK_INTERVAL, so a dead cluster costs one timeout
+    _healthy = None
+    _checked_at = 0.0
+
+    def get_client(self, timeout=None):
+        return connections.get_connection().options(
+            request_timeout=timeout or settings.SEARCH_REQUEST_TIMEOUT
+        )
+
+    def get_search(self):
+        return ProductDocument.search(using=self.get_client())
+
+    def is_available(self):
+        cls = type(self)
+        if cls._healthy is not None and time.monotonic() - cls._checked_at < settings.SEARCH_HEALTHCHECK_INTERVAL:
+            return cls._healthy
+
+        try:
+            # the alias only exists once a build has completed, so a cluster
+            # that is up but still warming counts as unavailable
+            client = self.get_client(timeout=settings.SEARCH_HEALTHCHECK_TIMEOUT)
+            healthy = bool(client.indices.exists(index=ProductDocument._index._name))
+        except Exception as e:
+            AppLogger.warning(f"Elasticsearch health check failed: {e}")
+            healthy = False
+
+        cls._healthy = healthy
+        cls._checked_at = time.monotonic()
+
+        return healthy
+
+    def mark_unavailable(self):
+        cls = type(self)
+        cls._healthy = False
+        cls._checked_at = time.monotonic()
+
+    def get_text_search(self, query=None):
+        s = self.get_search()
+
+        # Text search query
+        if query:
+            s = s.query(
+                'multi_match',
+                query=query,
+                fields=[
+                    'name^3',  # Boost name field
+                    'description^2',
+                    'short_description',
+                    'brand.name',
+                    'category.name',
+                    'tags.name',
+                ],
+                fuzziness='AUTO'
+            )
+
+        return s
+
+    def search(self, query=None, size=10):
+        return self.build_suggestions(self.get_text_search(query)[:size].execute())
+
+    def apply_filters(self, s, filters):
+        for field in ('category', 'brand'):
+            value = filters.get(field)
+            if value:
+                key = 'id' if isinstance(value, int) else 'name.raw'
+                s = s.filter('term', **{f'{field}.{key}': value})
+        if filters.get('subcategory'):
+            s = s.filter('nested', path='sub_categories', query=Q(
+                'match_phrase', **{'sub_categories.name': filters['subcategory']}
+            ))
+        for path in ('tags', 'colors'):
+            if filters.get(path):
+                s = s.filter('nested', path=path, query=Q('terms', **{f'{path}.name.raw': filters[path]}))
+
+        price = {}
+        if filters.get('min_price') is not None:
+            price['gte'] = filters['min_price']
+        if filters.get('max_price') is not None:
+            price['lte'] = filters['max_price']
+        if price:
+            s = s.filter('range', discounted_price=price)
+        if filters.get('in_stock'):
+            s = s.filter('range', stock={'gt': 0})
+
+        return s
+
+    def add_facet_aggs(self, s):
+        size = settings.SEARCH_FACET_SIZE
+
+        s.aggs.bucket('categories', 'terms', field='category.name.raw', size=size)
+        s.aggs.bucket('brands', 'terms', field='brand.name.raw', size=size)
+        for path in ('colors', 'tags'):
+            # count products rather than nested color/tag objects
+            s.aggs.bucket(path, 'nested', path=path).bucket(
+                'names', 'terms', field=f'{path}.name.raw', size=size
+            ).bucket('products', 'reverse_nested')
+
+        steps = settings.SEARCH_PRICE_FACET_STEPS
+        bounds = [None, *steps, None]
+        s.aggs.bucket('price', 'range', field='discounted_price', ranges=[
+            {k: v for k, v in (('from', low), ('to', high)) if v is not None}
+            for low, high in zip(bounds, bounds[1:])
+        ])
+
+        return s
+
+    def faceted_search(self, query=None, filters=None, size=10):
+        s = self.apply_filters(self.get_text_search(query), filters or {})
+        s = self.add_facet_aggs(s)[:size]
+
+        # hits and every aggregation come back in the same response
+        response = s.execute()
+        aggs = response.aggregations
+
+        facets = {
+            group: [{'name': b.key, 'count': b.doc_count} for b in aggs[group].buckets]
+            for group in ('categories', 'brands')
+        }
+        for group in ('colors', 'tags'):
+            facets[group] = [
+                {'name': b.key, 'count': b.products.doc_count} for b in aggs[group].names.buckets
+            ]
+        facets['price'] = [
+            {'from': getattr(b, 'from', None), 'to': getattr(b, 'to', None), 'count': b.doc_count}
+            for b in aggs.price.buckets if b.doc_count
+        ]
+
+        return {'results': self.build_suggestions(response), 'facets': facets}
+
+    def get_autocomplete_search(self, query, size=10):
+        s = self.get_search()
+        s = s.query(
+            'match',
+            name__suggest=query
+        )[:size]
+
+        s = s.query(
+            'bool',
+            should=[
+                {'match': {'name__suggest': {'query': query, 'boost': 2}}},
+                {'prefix': {'name.raw': {'value': query.lower(), 'boost': 3}}}
+            ],
+            minimum_should_match=1
+        )
+
+        return s
+
+    def get_header_search(self, document, query, size):
+        return document.search(using=self.get_client()).query(
+            'match', name={'query': query, 'operator': 'and'}
+        ).filter('term', is_live=True).source(['id', 'name'])[:size]
+
+    def build_suggestions(self, response):
+        self.took = response.took
+        self.total = response.hits.total.value
+
+        return [
+            {
+                'text': hit.name,
+                'score': hit.meta.score,
+                'product': hit.to_dict()
+            }
+            for hit in response.hits
+        ]
+
+    def autocomplete(self, query, size=10):
+        return self.build_suggestions(self.get_autocomplete_search(query, size).execute())
+
+    def header_search(self, query, sizes):
+        searches = {}
+        if sizes.get('products'):
+            searches['products'] = self.get_autocomplete_search(query, sizes['products'])
+        for group, document in (('categories', CategoryDocument), ('brands', BrandDocument), ('vendors', VendorDocument)):
+            if sizes.get(group):
+                searches[group] = self.get_header_search(document, query, sizes[group])
+
+        if not searches:
+            return {}
+
+        # every group goes out in one _msearch request, each search carries
+        # its own index in the request header
+        ms = MultiSearch(using=self.get_client())
+        for search in searches.values():
+            ms = ms.add(search)
+
+        results = {}
+        responses = ms.execute(raise_on_error=False)
+        for group, response in zip(searches, responses):
+            if not response.success():
+                AppLogger.warning(f"Header search for {group} failed")
+                results[group] = []
+            elif group == 'products':
+                results[group] = self.build_suggestions(response)
+            else:
+                results[group] = [{'id': hit.id, 'name': hit.name} for hit in response.hits]
+
+        self.took = max((response.took for response in responses if response.success()), default=None)
+        self.total = sum(len(group) for group in results.values())
+
+        return results
+
+    def similar(self, product_id, size=5):
+        s = self.get_search()
+        s = s.query(
+            'more_like_this',
+            fields=['name', 'description', 'category.name', 'tags.name'],
+            like=[{'_id': product_id}],
+            min_term_freq=1,
+            max_query_terms=12
+        )
+        s = s[:size]
+
+        response = s.execute()
+        return [hit.to_dict() for hit in response]
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Degraded-mode search over ProductSearchText. Uses PostgreSQL full-text
+    search (GIN indexed) in production and SQLite FTS5 under DEBUG.
+    """
+
+    name = "database"
+    fts_table = "products_productsearchtext_fts"
+
+    def is_available(self):
+        return True
+
+    def get_terms(self, query):
+        return re.findall(r"\w+", (query or "").lower())[:10]
+
+    def match(self, query, size, prefix=False):
+        """Return ``[(product_id, score), ...]`` best first"""
+        from products.models import ProductSearchText
+
+        terms = self.get_terms(query)
+        if not terms:
+            return []
+
+        if connection.vendor == "postgresql":
+            if prefix:
+                search_query = SearchQuery(
+                    " & ".join(f"{term}:*" for term in terms), search_type="raw", config="english"
+                )
+            else:
+                search_query = SearchQuery(query, search_type="websearch", config="english")
+
+            rows = ProductSearchText.objects.annotate(
+                search=search_vector(),
+            ).filter(search=search_query).annotate(
+                rank=SearchRank(search_vector(), search_query)
+            ).order_by("-rank").values_list("product_id", "rank")[:size]
+
+            return list(rows)
+
+        if connection.vendor == "sqlite":
+            joiner = " AND " if prefix else " OR "
+            expression = joiner.join(f'"{term}"*' for term in terms)
+            column = "name : " if prefix else ""
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT rowid, -bm25({self.fts_table}, 10.0, 1.0) FROM {self.fts_table} "
+                    f"WHERE {self.fts_table} MATCH %s ORDER BY bm25({self.fts_table}, 10.0, 1.0) LIMIT %s",
+                    [f"{column}({expression})", size]
+                )
+                return cursor.fetchall()
+
+        rows = ProductSearchText.objects.filter(name__icontains=terms[0]).values_list("product_id", flat=True)[:size]
+        return [(product_id, 1.0) for product_id in rows]
+
+    def get_filter_q(self, filters):
+        from products.models import Product
+
+        q = DjangoQ()
+        for field in ('category', 'brand'):
+            value = filters.get(field)
+            if value:
+                lookup = f'{field}_id' if isinstance(value, int) else f'{field}__name__iexact'
+                q &= DjangoQ(**{lookup: value})
+        if filters.get('subcategory'):
+            q &= related_exists(Product, 'sub_categories', name__iexact=filters['subcategory'])
+        if filters.get('tags'):
+            q &= related_exists(Product, 'tags', name__in=filters['tags'])
+        if filters.get('colors'):
+            q &= related_exists(Product, 'colors', name__in=filters['colors'])
+        if filters.get('min_price') is not None:
+            q &= DjangoQ(effective_price__gte=filters['min_price'])
+        if filters.get('max_price') is not None:
+            q &= DjangoQ(effective_price__lte=filters['max_price'])
+        if filters.get('in_stock'):
+            q &= DjangoQ(stock__gt=0)
+
+        return q
+
+    def build_results(self, matches, q=None):
+        document = ProductDocument()
+        ids = [product_id for product_id, _ in matches]
+        products = document.get_queryset().filter(
+            q or DjangoQ(), pk__in=ids, deleted_at__isnull=True
+        ).in_bulk()
+
+        results = [
+            {
+                'text': products[product_id].name,
+                'score': score,
+                'product': document.prepare(products[product_id]),
+            }
+            for product_id, score in matches if product_id in products
+        ]
+        self.total = len(results)
+
+        return results
+
+    def search(self, query=None, size=10):
+        if not query:
+            document = ProductDocument()
+            products = document.get_queryset().filter(deleted_at__isnull=True).order_by("-created_at")[:size]
+            results = [{'text': p.name, 'score': None, 'product': document.prepare(p)} for p in products]
+            self.total = len(results)
+            return results
+
+        return self.build_results(self.match(query, size))
+
+    def autocomplete(self, query, size=10):
+        return self.build_results(self.match(query, size, prefix=True))
+
+    def faceted_search(self, query=None, filters=None, size=10):
+        # facet counts would cost a COUNT(DISTINCT) per value here, so the
+        # fallback serves results only
+        if not size:
+            return {'results': [], 'facets': {}}
+
+        q = self.get_filter_q(filters or {})
+        if query:
+            # over-fetch matches so filtering still leaves a full page
+            results = self.build_results(self.match(query, size * 5), q)[:size]
+        else:
+            document = ProductDocument()
+            products = document.get_queryset().filter(q, deleted_at__isnull=True).order_by("-created_at")[:size]
+            results = [{'text': p.name, 'score': None, 'product': document.prepare(p)} for p in products]
+
+        self.total = len(results)
+
+        return {'results': results, 'facets': {}}
+
+    def header_search(self, query, sizes):
+        from accounts.models import VendorProfile, VendorStatus
+        from products.models import Category, Brand
+
+        terms = self.get_terms(query)
+        results = {}
+
+        if sizes.get('products'):
+            results['products'] = self.autocomplete(query, size=sizes['products'])
+
+        lookups = (
+            ('categories', Category.available_objects.all(), 'name'),
+            ('brands', Brand.available_objects.all(), 'name'),
+            ('vendors', VendorProfile.available_objects.filter(status=VendorStatus.approved).annotate(
+                display_name=Coalesce(NullIf('store_name', Value('')), 'business_name')
+            ), 'display_name'),
+        )
+        for group, queryset, field in lookups:
+            if not sizes.get(group):
+                continue
+            if not terms:
+                results[group] = []
+                continue
+
+            for term in terms:
+                queryset = queryset.filter(**{f"{field}__icontains": term})
+            results[group] = [
+                {'id': pk, 'name': name}
+                for pk, name in queryset.order_by(field).values_list('pk', field)[:sizes[group]]
+            ]
+
+        self.total = sum(len(group) for group in results.values())
+
+        return results
+
+    def similar(self, product_id, size=5):
+        from products.models import Product
+
+        document = ProductDocument()
+        product = Product.objects.filter(pk=product_id).only("category_id").first()
+        if not product or not product.category_id:
+            return []
+
+        products = document.get_queryset().filter(
+            category_id=product.category_id, deleted_at__isnull=True
+        ).exclude(pk=product_id).order_by("-rating")[:size]
+
+        return [document.prepare(p) for p in products]
+
+    def index_products(self, product_ids):
+        from products.models import Product, ProductSearchText
+
+        products = Product.objects.filter(pk__in=product_ids).select_related(
+            "category", "brand"
+        ).prefetch_related("tags", "sub_categories")
+
+        ProductSearchText.objects.bulk_create(
+            [
+                ProductSearchText(product=product, name=product.name, body=build_search_body(product))
+                for product in products
+            ],
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["name", "body"],
+        )
+
+    def remove_products(self, product_ids):
+        from products.models import ProductSearchText
+
+        ProductSearchText.objects.filter(product_id__in=product_ids).delete()
+
+
+def get_search_backends():
+    """Backends to try for the current request, preferred first"""
+    mode = settings.SEARCH_BACKEND
+
+    if mode == "database":
+        return [DatabaseSearchBackend()]
+    if mode == "elasticsearch":
+        return [ElasticsearchBackend()]
+
+    elasticsearch = ElasticsearchBackend()
+    if elasticsearch.is_available():
+        return [elasticsearch, DatabaseSearchBackend()]
+
+    return [DatabaseSearchBackend()]
+
+
+def run_search(method, *args, stats=None, **kwargs):
+    """
+    Call ``method`` on the preferred backend, falling back if it fails.
+
+    When ``stats`` is a dict it is filled with the name of the backend that
+    answered and its ``took`` and ``total``.
+    """
+    backends = get_search_backends()
+
+    for backend in backends[:-1]:
+        try:
+            result = getattr(backend, method)(*args, **kwargs)
+            break
+        except Exception as e:
+            AppLogger.warning(f"{backend.name} search failed, falling back: {e}")
+            backend.mark_unavailable()
+    else:
+        backend = backends[-1]
+        result = getattr(backend, method)(*args, **kwargs)
+
+    if stats is not None:
+        stats.update(backend=backend.name, took=backend.took, total=backend.total)
+
+    return result
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from products.services.ranking_service import RankingService
+
+
+class SalesRollupService:
+    """
+    Aggregates paid order items into ProductSalesDaily. Each run re-adds up
+    the last few days in full, so payments confirmed late or refunded
+    orders are picked up and running it twice changes nothing.
+    """
+
+    def get_order_items(self, start):
+        from payments.models import OrderItem, PaymentStatus
+
+        return OrderItem.objects.filter(
+            order__payment_status=PaymentStatus.paid,
+            order__refunded=False,
+            order__deleted_at__isnull=True,
+            order__paid_at__date__gte=start,
+            deleted_at__isnull=True,
+            product__isnull=False,
+        )
+
+    def rollup(self, days=None):
+        from products.models import ProductSalesDaily
+
+        days = days or settings.SALES_ROLLUP_LOOKBACK_DAYS
+        start = timezone.localdate() - timedelta(days=days - 1)
+
+        rows = self.get_order_items(start).annotate(
+            day=TruncDate("order__paid_at")
+        ).values("product_id", "day").annotate(
+            units=Sum("quantity"), revenue=Sum("price")
+        ).order_by()
+
+        daily = [
+            ProductSalesDaily(
+                product_id=row["product_id"], day=row["day"], units=row["units"] or 0, revenue=row["revenue"] or 0
+            )
+            for row in rows
+        ]
+
+        with transaction.atomic():
+            ProductSalesDaily.objects.filter(day__gte=start).delete()
+            ProductSalesDaily.objects.bulk_create(daily, batch_size=1000)
+
+        return len(daily)
+
+
+class BestSellerService(RankingService):
+    """Best sellers by units sold over the last ``days`` days of ProductSalesDaily"""
+
+    def __init__(self, days=7, top_n=None):
+        from products.models import RankingKind
+
+        super().__init__(top_n=top_n)
+        self.days = days
+        # only windows with a RankingKind are stored
+        self.kind = RankingKind(f"best_seller_{days}d")
+
+    def compute_scores(self):
+        from products.models import ProductSalesDaily
+
+        start = timezone.localdate() - timedelta(days=self.days - 1)
+        rows = ProductSalesDaily.objects.filter(day__gte=start).values("product_id").annotate(
+            units=Sum("units")
+        ).order_by().values_list("product_id", "units")
+
+        return dict(rows)
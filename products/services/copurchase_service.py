@@ -0,0 +1,219 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class CoPurchaseService:
+    """
+    "Frequently bought together" lists computed from paid orders.
+
+    Each run reads the orders paid since the watermark in chunks, counts the
+    product pairs of a chunk with numpy, adds them to the sparse
+    CoPurchaseCount table and re-ranks the products those orders contain
+    together with their partners, whose scores move with them.
+    Partners are scored by cosine similarity,
+    ``orders(a, b) / sqrt(orders(a) * orders(b))``, so best sellers do not
+    show up in every list just for being popular.
+    """
+
+    watermark_name = "copurchase"
+
+    def __init__(self, top_k=None, chunk_size=None):
+        from products.models import AssociationKind
+
+        self.kind = AssociationKind.copurchase
+        self.top_k = top_k or settings.COPURCHASE_TOP_K
+        self.chunk_size = chunk_size or settings.COPURCHASE_ORDER_CHUNK_SIZE
+        self.settle_seconds = settings.COPURCHASE_SETTLE_SECONDS
+
+    def get_paid_orders(self):
+        from payments.models import Order, PaymentStatus
+
+        return Order.objects.filter(
+            payment_status=PaymentStatus.paid, refunded=False, deleted_at__isnull=True, paid_at__isnull=False
+        )
+
+    def get_next_chunk(self, since, until):
+        """
+        Ids and paid_at of the next orders after ``since``. Orders sharing
+        the last paid_at are all included, since the watermark cannot split
+        them.
+        """
+        orders = self.get_paid_orders().filter(paid_at__lte=until)
+        if since:
+            orders = orders.filter(paid_at__gt=since)
+
+        boundary = list(orders.order_by("paid_at").values_list("paid_at", flat=True)[self.chunk_size - 1:self.chunk_size])
+        if boundary:
+            orders = orders.filter(paid_at__lte=boundary[0])
+
+        chunk = list(orders.values_list("pk", "paid_at"))
+        if not chunk:
+            return [], since
+
+        return [pk for pk, _ in chunk], max(paid_at for _, paid_at in chunk)
+
+    def count_pairs(self, order_ids, product_ids):
+        """
+        Co-occurrence counts of a chunk of line items, given the order and
+        product of each line. Returns parallel ``(product, other, orders)``
+        arrays, both directions and the diagonal included.
+        """
+        lines = np.column_stack([
+            np.asarray(order_ids, dtype=np.int64), np.asarray(product_ids, dtype=np.int64)
+        ]).reshape(-1, 2)
+        if not len(lines):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+
+        # one line per product per order, grouped by order
+        lines = np.unique(lines, axis=0)
+        products = lines[:, 1]
+        _, starts, sizes = np.unique(lines[:, 0], return_index=True, return_counts=True)
+
+        # pair every line with every line of its order, itself included
+        line_sizes = np.repeat(sizes, sizes)
+        left = np.repeat(np.arange(len(products)), line_sizes)
+        offsets = np.arange(len(left)) - np.repeat(np.cumsum(line_sizes) - line_sizes, line_sizes)
+        right = np.repeat(np.repeat(starts, sizes), line_sizes) + offsets
+
+        pairs, counts = np.unique(np.column_stack([products[left], products[right]]), axis=0, return_counts=True)
+
+        return pairs[:, 0], pairs[:, 1], counts
+
+    def add_counts(self, products, others, counts):
+        from products.models import CoPurchaseCount
+
+        touched = np.unique(products).tolist()
+        existing = {}
+        for start in range(0, len(touched), 500):
+            existing.update(
+                ((product_id, other_id), orders)
+                for product_id, other_id, orders in CoPurchaseCount.objects.filter(
+                    product_id__in=touched[start:start + 500], other_id__in=touched
+                ).values_list("product_id", "other_id", "orders")
+            )
+
+        rows = [
+            CoPurchaseCount(product_id=product_id, other_id=other_id, orders=existing.get((product_id, other_id), 0) + count)
+            for product_id, other_id, count in zip(products.tolist(), others.tolist(), counts.tolist())
+        ]
+        CoPurchaseCount.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True, unique_fields=["product", "other"], update_fields=["orders"]
+        )
+
+        return touched
+
+    def get_affected(self, product_ids):
+        """These products and every product bought with them, counts are stored both ways"""
+        from products.models import CoPurchaseCount
+
+        affected = set(product_ids)
+        for start in range(0, len(product_ids), 500):
+            affected.update(
+                CoPurchaseCount.objects.filter(product_id__in=product_ids[start:start + 500]).values_list("other_id", flat=True)
+            )
+
+        return sorted(affected)
+
+    def rank(self, product_ids):
+        """Return ``{product_id: [(other_id, score), ...]}`` best first"""
+        from products.models import CoPurchaseCount
+
+        results = {product_id: [] for product_id in product_ids}
+
+        rows = np.array(
+            list(CoPurchaseCount.objects.filter(product_id__in=product_ids).values_list("product_id", "other_id", "orders")),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        products, others, counts = rows.T
+
+        # orders containing each product, read off the diagonal
+        partner_ids = np.unique(others)
+        totals = dict(
+            CoPurchaseCount.objects.filter(
+                product_id__in=partner_ids.tolist(), other_id=F("product_id")
+            ).values_list("product_id", "orders")
+        )
+        totals = np.array([totals.get(product_id, 0) for product_id in partner_ids.tolist()], dtype=np.float64)
+        own = totals[np.searchsorted(partner_ids, products)]
+        partner = totals[np.searchsorted(partner_ids, others)]
+
+        keep = (products != others) & (own > 0) & (partner > 0)
+        products, others = products[keep], others[keep]
+        scores = counts[keep] / np.sqrt(own[keep] * partner[keep])
+
+        # best first within each product, ties to the newer product
+        order = np.lexsort((-others, -scores, products))
+        products, others, scores = products[order], others[order], scores[order]
+        group_starts = np.r_[0, np.flatnonzero(np.diff(products)) + 1]
+        ranks = np.arange(len(products)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(products)]))
+
+        top = ranks < self.top_k
+        for product_id, other_id, score in zip(products[top].tolist(), others[top].tolist(), scores[top].tolist()):
+            results[product_id].append((other_id, score))
+
+        return results
+
+    def store(self, results):
+        from products.models import ProductAssociation
+
+        rows = [
+            ProductAssociation(kind=self.kind, product_id=product_id, other_id=other, rank=rank, score=score)
+            for product_id, partners in results.items()
+            for rank, (other, score) in enumerate(partners, start=1)
+        ]
+
+        with transaction.atomic():
+            ProductAssociation.objects.filter(kind=self.kind, product_id__in=list(results)).delete()
+            ProductAssociation.objects.bulk_create(rows, batch_size=1000)
+
+    def run(self, now=None):
+        """Consume the orders paid since the last run, returns how many"""
+        from payments.models import OrderItem
+        from products.models import BatchWatermark
+
+        # orders paid in the last few minutes may belong to transactions
+        # that are not committed yet, the next run picks them up
+        until = (now or timezone.now()) - timedelta(seconds=self.settle_seconds)
+
+        processed = 0
+        while True:
+            with transaction.atomic():
+                # the row lock keeps overlapping runs from counting an order twice
+                watermark, _ = BatchWatermark.objects.select_for_update().get_or_create(name=self.watermark_name)
+                order_ids, paid_until = self.get_next_chunk(watermark.value, until)
+                if not order_ids:
+                    break
+
+                lines = list(OrderItem.objects.filter(
+                    order_id__in=order_ids, product__isnull=False, deleted_at__isnull=True
+                ).values_list("order_id", "product_id"))
+                order_column, product_column = zip(*lines) if lines else ((), ())
+
+                touched = self.add_counts(*self.count_pairs(order_column, product_column))
+
+                watermark.value = paid_until
+                watermark.save(update_fields=["value", "updated_at"])
+
+            affected = self.get_affected(touched)
+            for start in range(0, len(affected), 500):
+                self.store(self.rank(affected[start:start + 500]))
+            processed += len(order_ids)
+
+        return processed
+
+    def rebuild(self):
+        """Forget all counts and lists and recount every paid order"""
+        from products.models import BatchWatermark, CoPurchaseCount, ProductAssociation
+
+        with transaction.atomic():
+            CoPurchaseCount.objects.all().delete()
+            ProductAssociation.objects.filter(kind=self.kind).delete()
+            BatchWatermark.objects.filter(name=self.watermark_name).delete()
+
+        return self.run()
@@ -1,38 +1,25 @@
 from django.db.models import Q
-from django.utils import timezone
 
-from products.models import DealOfTheDay, TopShopper
+from products.services.product_service import ProductService
+from products.services.sale_schedule_service import SaleScheduleService
 from services.util import CustomRequestUtil
 
 
-
-
 class DOTDService(CustomRequestUtil):
 
     def fetch_active_deals(self):
-        q = Q(is_active=True)
+        from products.models import SaleState
 
-        return self.get_base_query().filter(q)
+        q = Q(add_to_deal_of_the_day=True) & ~Q(sale_state__in=[SaleState.upcoming, SaleState.ended])
 
+        return self.get_base_query().filter(q)
 
     def get_base_query(self):
-        return DealOfTheDay.objects.select_related("product")
+        return ProductService(self.request).get_base_query()
 
     def toggle_active_state(self):
-
-        now = timezone.now()
-        for deal in DealOfTheDay.objects:
-            deal.is_active = True if deal.start_time <= now <= deal.end_time else False
-            deal.save()
+        # sale states are precomputed, this only applies transitions that
+        # are due, in bulk
+        SaleScheduleService().run()
 
         return None
-
-
-class TopShopperService(CustomRequestUtil):
-
-    def fetch_list(self):
-        return self.get_base_query()[:3]
-
-
-    def get_base_query(self):
-        return TopShopper.objects.order_by('-id')
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from services.log import AppLogger
+
+
+class PricingService:
+    """Keeps Product.effective_price right as sale windows open and close"""
+
+    batch_size = 500
+
+    def get_stale_queryset(self, now=None):
+        """
+        Sale products whose stored price disagrees with their window: still
+        full price although the window is open, or still discounted after it
+        closed (or before it opened).
+        """
+        from products.models import Product
+
+        now = now or timezone.now()
+        in_window = Q(sale_start__lte=now, sale_end__gte=now)
+
+        return Product.objects.filter(
+            add_product_to_sales=True,
+            percentage_discount__gt=0,
+            sale_start__isnull=False,
+            sale_end__isnull=False,
+        ).filter(
+            (in_window & Q(effective_price__gte=F("price")))
+            | (~in_window & Q(effective_price__lt=F("price")))
+        )
+
+    def refresh(self, queryset):
+        """Recompute effective_price for these products, returns the changed ids"""
+        from products.models import Product
+
+        now = timezone.now()
+        changed = []
+        for product in queryset.iterator(chunk_size=self.batch_size):
+            effective_price = product.get_effective_price()
+            if effective_price != product.effective_price:
+                product.effective_price = effective_price
+                # bumping updated_at lets sync_product_index see the change too
+                product.updated_at = now
+                changed.append(product)
+
+        Product.objects.bulk_update(changed, ["effective_price", "updated_at"], batch_size=self.batch_size)
+
+        return [product.pk for product in changed]
+
+    def reindex(self, product_ids):
+        if not product_ids or not getattr(settings, "ELASTICSEARCH_DSL_AUTOSYNC", True):
+            return
+
+        from products.services.search_index_service import SearchIndexService
+
+        service = SearchIndexService()
+        try:
+            service.populate(queryset=service.get_queryset().filter(pk__in=product_ids))
+        except Exception as e:
+            # updated_at was bumped, so the next sync_product_index catches up
+            AppLogger.error(f"Failed to reindex repriced products: {e}")
@@ -1,11 +1,13 @@
 import random
 import string
 from django.core.paginator import Paginator
-from django.db import models
-from django.db.models import Count, Case, When, ExpressionWrapper, DecimalField, F, Q, Avg
+from django.db.models import Count, F, Q, Avg, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-from media.models import Upload
+from media.models import Upload, UploadStatus
+from media.services import MediaIngestionService
+from services.query import related_exists
 from services.util import CustomRequestUtil
 
 
@@ -77,32 +79,31 @@ class ProductService(CustomRequestUtil):
         if subcategories:
             product.sub_categories.set(subcategories)
 
-        for img in media:
-            Upload.objects.create(
-                image=img,
-                product=product,
-                created_by=self.auth_user
-            )
+        # spooled here, sent to Cloudinary by a background task
+        MediaIngestionService(self.auth_user).ingest(product, media)
 
         message = "Product was created successfully"
 
         return message, None
 
     def fetch_list(self, category=None, subcategory=None, paginate=False, vendor=None, is_deal=False):
+        from products.models import Product
+
         q = Q()
         if category:
             q &= Q(category__name__iexact=category)
 
         if is_deal:
-            q &= Q(add_to_deal_of_the_day=True)
+            from products.models import SaleState
+            q &= Q(add_to_deal_of_the_day=True) & ~Q(sale_state__in=[SaleState.upcoming, SaleState.ended])
 
         if subcategory:
-            q &= Q(sub_categories__name__iexact=subcategory)
+            q &= related_exists(Product, "sub_categories", name__iexact=subcategory)
 
         if vendor:
             q &= Q(created_by=vendor.user)
 
-        products = self.get_base_query().filter(q).distinct()
+        products = self.get_base_query().filter(q)
 
         if paginate:
             paginator = Paginator(products, 25)  # 25 items per page
@@ -116,51 +117,121 @@ class ProductService(CustomRequestUtil):
         return products
 
     def update_product_views(self, product):
-        product.views += 1
-        product.save(update_fields=["views"])
-        product.refresh_from_db()
+        from products.models import Product
+        from products.services.trending_service import TrendingService
+
+        # atomic increments, concurrent views no longer overwrite each other
+        Product.objects.filter(pk=product.pk).update(views=F("views") + 1)
+        TrendingService().record(product.pk, views=1)
 
         return None
 
     def update_quantity_sold(self, product, quantity=1):
-        product.quantity_sold += quantity
-        product.save(update_fields=["quantity_sold"])
-        product.refresh_from_db()
+        from products.models import Product
+        from products.services.trending_service import TrendingService
+
+        # concurrent payments for the same product must not lose sales
+        Product.objects.filter(pk=product.pk).update(quantity_sold=F("quantity_sold") + quantity)
+        product.refresh_from_db(fields=["quantity_sold"])
+
+        TrendingService().record(product.pk, purchases=quantity)
 
         return None
 
-    def get_related_products(self, product_id, limit=5):
-        product, _ = self.fetch_single(product_id)
+    def get_related_products(self, product, limit=5):
+        from products.models import AssociationKind
 
+        # precomputed by RelatedProductsService, a single lookup on the
+        # (kind, product, rank) index
         related_products = self.get_base_query().filter(
-            models.Q(category=product.category) | models.Q(tags__in=product.tags.all())
-        ).exclude(id=product.id).distinct()[:limit]
+            associated_from__kind=AssociationKind.related, associated_from__product=product
+        ).order_by("associated_from__rank")[:limit]
+
+        if related_products:
+            return related_products
+
+        # not computed yet, e.g. a product created since the last run
+        return self.get_base_query().filter(category_id=product.category_id).exclude(id=product.id)[:limit]
+
+    def get_frequently_bought_together(self, product_ids, limit=4):
+        """
+        Partners of any of these products (a product page or a cart) from
+        the precomputed co-purchase lists, strongest first
+        """
+        from products.models import AssociationKind, ProductAssociation
+
+        product_ids = list(product_ids)
+        lists = ProductAssociation.objects.filter(kind=AssociationKind.copurchase, product_id__in=product_ids)
+        best_score = lists.filter(other=OuterRef("pk")).order_by("-score").values("score")[:1]
+
+        return self.get_base_query().filter(
+            pk__in=lists.values("other_id")
+        ).exclude(
+            pk__in=product_ids
+        ).annotate(
+            copurchase_score=Subquery(best_score)
+        ).order_by("-copurchase_score", "-pk")[:limit]
+
+    def get_ranked_products(self, kind, scope=None, scope_id=0, limit=5, exclude=None, fallback=None):
+        """
+        Precomputed top products of a ranking, e.g. trending in a category.
+        When nothing is ranked for the scope yet (no recent activity) and a
+        ``fallback`` ordering is given, the scope's products in that order.
+        """
+        from products.models import RankingScope
 
-        return related_products
+        products = self.get_base_query().filter(
+            rankings__kind=kind, rankings__scope=scope or RankingScope.site, rankings__scope_id=scope_id or 0
+        ).order_by("rankings__rank")
+        if exclude:
+            products = products.exclude(pk=exclude)
+
+        products = products[:limit]
+        if products or not fallback:
+            return products
+
+        products = self.get_base_query().filter(**self.get_scope_filter(scope, scope_id))
+        if exclude:
+            products = products.exclude(pk=exclude)
+
+        return products.order_by(fallback)[:limit]
+
+    def get_trending_products(self, scope=None, scope_id=0, limit=5, exclude=None):
+        from products.models import RankingKind
+
+        return self.get_ranked_products(RankingKind.trending, scope, scope_id, limit, exclude, fallback="-views")
+
+    def get_best_sellers(self, days=7, scope=None, scope_id=0, limit=10, exclude=None):
+        from products.models import RankingKind
+
+        return self.get_ranked_products(
+            RankingKind(f"best_seller_{days}d"), scope, scope_id, limit, exclude, fallback="-quantity_sold"
+        )
+
+    def get_scope_filter(self, scope, scope_id):
+        from products.models import RankingScope
+
+        if scope == RankingScope.category:
+            return {"category_id": scope_id}
+        if scope == RankingScope.vendor:
+            return {"created_by_id": scope_id}
+        return {}
 
     def get_base_query(self):
-        from products.models import Product
+        from products.models import Product, ProductReview
         qs = Product.available_objects.prefetch_related(
-            "tags", "colors", "sub_categories", "product_media"
+            "tags", "colors", "sub_categories",
+            # images still being uploaded have nothing to show yet
+            Prefetch("product_media", queryset=Upload.objects.filter(status=UploadStatus.ready)),
         ).select_related(
             "category", "brand"
         ).order_by("rating")
 
+        # a per row count, joining the reviews would GROUP BY the whole product row
+        reviews = ProductReview.objects.filter(product=OuterRef("pk")).order_by().values("product")
         qs = qs.annotate(
-            discounted_price=Case(
-                When(
-                    percentage_discount__isnull=False,
-                    percentage_discount__gt=0,
-                    then=ExpressionWrapper(
-                        F('price') - ((F('percentage_discount') * F("price")) / 100),
-                        output_field=DecimalField(max_digits=15, decimal_places=2)
-                    )
-                ),
-                default=F('price'),
-                output_field=DecimalField(max_digits=15, decimal_places=2)
-            ),
-
-            reviews_count=Count('reviews')
+            discounted_price=F("effective_price"),
+            reviews_count=Coalesce(Subquery(reviews.annotate(count=Count("pk")).values("count")), 0)
         )
 
         return qs
@@ -225,12 +296,7 @@ class ProductService(CustomRequestUtil):
             # Optional: clear existing images if desired
             # Upload.objects.filter(product=product).delete()
 
-            for img in media_files:
-                Upload.objects.create(
-                    image=img,
-                    product=product,
-                    created_by=self.auth_user
-                )
+            MediaIngestionService(self.auth_user).ingest(product, media_files)
 
         message = "Product was updated successfully"
 
@@ -265,13 +331,13 @@ class ProductService(CustomRequestUtil):
         from products.models import ProductReview
 
         # Aggregate data for average rating and ratings distribution
-        ratings_data = ProductReview.objects.filter(product_id=product_id).aggregate(
+        ratings_data = ProductReview.available_objects.filter(product_id=product_id).aggregate(
             avg_rating=Avg('rating'),
             total_reviews=Count('id'),
         )
 
         # Distribution of ratings (e.g., 5 stars, 4 stars, etc.)
-        rating_distribution = ProductReview.objects.filter(product_id=product_id).values(
+        rating_distribution = ProductReview.available_objects.filter(product_id=product_id).values(
             'rating'
         ).annotate(
             count=Count('id')
@@ -0,0 +1,79 @@
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+
+class RankingService:
+    """
+    Turns per-product scores into stored top-N lists per scope (site-wide,
+    per category and per vendor) so reads are a single indexed lookup.
+    Subclasses set ``kind`` and implement ``compute_scores``.
+    """
+
+    kind = None
+    chunk_size = 1000
+
+    def __init__(self, top_n=None):
+        self.top_n = top_n or settings.RANKING_TOP_N
+
+    def compute_scores(self):
+        """Return ``{product_id: score}``"""
+        raise NotImplementedError
+
+    def get_scopes(self, product_ids):
+        """Yield ``(product_id, [(scope, scope_id), ...])`` for live products"""
+        from products.models import Product, RankingScope
+
+        product_ids = list(product_ids)
+        for start in range(0, len(product_ids), self.chunk_size):
+            rows = Product.available_objects.filter(
+                pk__in=product_ids[start:start + self.chunk_size]
+            ).values_list("pk", "category_id", "created_by_id")
+
+            for product_id, category_id, vendor_id in rows:
+                scopes = [(RankingScope.site, 0)]
+                if category_id:
+                    scopes.append((RankingScope.category, category_id))
+                if vendor_id:
+                    scopes.append((RankingScope.vendor, vendor_id))
+                yield product_id, scopes
+
+    def rank(self, scores):
+        """Return ``{(scope, scope_id): [(product_id, score), ...]}`` best first"""
+        heaps = defaultdict(list)
+        for product_id, scopes in self.get_scopes(pid for pid, score in scores.items() if score > 0):
+            entry = (scores[product_id], product_id)
+            for scope in scopes:
+                heap = heaps[scope]
+                if len(heap) < self.top_n:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+
+        return {
+            scope: [(product_id, score) for score, product_id in sorted(heap, reverse=True)]
+            for scope, heap in heaps.items()
+        }
+
+    def store(self, rankings):
+        from products.models import ProductRanking
+
+        rows = [
+            ProductRanking(
+                kind=self.kind, scope=scope, scope_id=scope_id, rank=rank, product_id=product_id, score=score
+            )
+            for (scope, scope_id), ranked in rankings.items()
+            for rank, (product_id, score) in enumerate(ranked, start=1)
+        ]
+
+        # readers see either the old lists or the new ones, never a mix
+        with transaction.atomic():
+            ProductRanking.objects.filter(kind=self.kind).delete()
+            ProductRanking.objects.bulk_create(rows, batch_size=1000)
+
+        return len(rows)
+
+    def refresh(self):
+        return self.store(self.rank(self.compute_scores()))
@@ -0,0 +1,160 @@
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+
+class RelatedProductsService:
+    """
+    Computes each product's top-K related products from category and tag
+    overlap and stores them as ProductAssociation rows.
+
+    Candidates come from an inverted tag -> products index built only for
+    the tags of the products being computed, plus the best rated products
+    of the same category, so the work grows with tag overlap rather than
+    with the catalog squared. Tags on more than ``max_tag_products`` live
+    products are left out of the index, which bounds a chunk's work by
+    chunk size x tags x that cap.
+    """
+
+    category_weight = 2.0
+    tag_weight = 1.0
+
+    def __init__(self, top_k=None, chunk_size=None, max_tag_products=None):
+        from products.models import AssociationKind
+
+        self.kind = AssociationKind.related
+        self.top_k = top_k or settings.RELATED_PRODUCTS_TOP_K
+        self.chunk_size = chunk_size or settings.RELATED_PRODUCTS_CHUNK_SIZE
+        self.max_tag_products = max_tag_products or settings.RELATED_PRODUCTS_MAX_TAG_PRODUCTS
+
+    def get_live_queryset(self):
+        from products.models import Product
+
+        return Product.available_objects.all()
+
+    def compute(self, product_ids):
+        """Return ``{product_id: [(other_id, score), ...]}`` best first"""
+        from products.models import Product
+
+        Tagging = Product.tags.through
+
+        categories = dict(self.get_live_queryset().filter(pk__in=product_ids).values_list("pk", "category_id"))
+
+        target_tags = defaultdict(set)
+        for product_id, tag_id in Tagging.objects.filter(product_id__in=categories).values_list("product_id", "tag_id"):
+            target_tags[product_id].add(tag_id)
+
+        # inverted index restricted to the tags that matter for this chunk
+        postings = defaultdict(list)
+        candidate_categories = {}
+        ratings = {}
+        wanted_tags = set().union(*target_tags.values()) if target_tags else set()
+        live_taggings = Tagging.objects.filter(tag_id__in=wanted_tags, product__deleted_at__isnull=True)
+
+        # a tag on most of the catalog would make every product in the chunk
+        # walk its whole posting list, for a score that separates nothing
+        wanted_tags = set(
+            live_taggings.values("tag_id").annotate(products=Count("pk")).filter(
+                products__lte=self.max_tag_products
+            ).values_list("tag_id", flat=True)
+        )
+        rows = live_taggings.filter(tag_id__in=wanted_tags).values_list(
+            "product_id", "tag_id", "product__category_id", "product__rating"
+        )
+        for product_id, tag_id, category_id, rating in rows.iterator(chunk_size=5000):
+            postings[tag_id].append(product_id)
+            candidate_categories[product_id] = category_id
+            ratings[product_id] = rating or 0
+
+        # same-category products all score alike, only the best rated few
+        # can ever make a top-K list
+        category_top = {}
+        for category_id in {c for c in categories.values() if c}:
+            top = self.get_live_queryset().filter(category_id=category_id).order_by(
+                "-rating", "-pk"
+            ).values_list("pk", "rating")[:self.top_k + 1]
+            category_top[category_id] = [product_id for product_id, _ in top]
+            ratings.update((product_id, rating or 0) for product_id, rating in top)
+
+        results = {}
+        for product_id, category_id in categories.items():
+            shared = Counter()
+            for tag_id in target_tags.get(product_id, ()):
+                shared.update(postings[tag_id])
+
+            scores = {
+                other: count * self.tag_weight
+                + (self.category_weight if category_id and candidate_categories.get(other) == category_id else 0.0)
+                for other, count in shared.items()
+            }
+            for other in category_top.get(category_id, ()):
+                scores.setdefault(other, self.category_weight)
+            scores.pop(product_id, None)
+
+            # ties go to the better rated, then the newer product
+            results[product_id] = heapq.nlargest(
+                self.top_k, scores.items(), key=lambda item: (item[1], ratings.get(item[0], 0), item[0])
+            )
+
+        return results
+
+    def store(self, results):
+        from products.models import ProductAssociation
+
+        rows = [
+            ProductAssociation(kind=self.kind, product_id=product_id, other_id=other, rank=rank, score=score)
+            for product_id, related in results.items()
+            for rank, (other, score) in enumerate(related, start=1)
+        ]
+
+        with transaction.atomic():
+            ProductAssociation.objects.filter(kind=self.kind, product_id__in=list(results)).delete()
+            ProductAssociation.objects.bulk_create(rows, batch_size=1000)
+
+    def refresh(self, product_ids):
+        """
+        Recompute the lists of these products and of every product whose
+        list mentions them. Products that should newly list them are caught
+        up by the next scheduled rebuild.
+        """
+        from products.models import ProductAssociation
+
+        affected = set(product_ids)
+        affected.update(
+            ProductAssociation.objects.filter(kind=self.kind, other_id__in=affected).values_list("product_id", flat=True)
+        )
+
+        # deleted products lose their own list
+        live = set(self.get_live_queryset().filter(pk__in=affected).values_list("pk", flat=True))
+        ProductAssociation.objects.filter(kind=self.kind, product_id__in=affected - live).delete()
+
+        affected = sorted(live)
+        for start in range(0, len(affected), self.chunk_size):
+            chunk = affected[start:start + self.chunk_size]
+            self.store(self.compute(chunk))
+
+        return len(affected)
+
+    def rebuild(self):
+        from products.models import ProductAssociation
+
+        last_id = 0
+        computed = 0
+        while True:
+            chunk = list(
+                self.get_live_queryset().filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:self.chunk_size]
+            )
+            if not chunk:
+                break
+
+            self.store(self.compute(chunk))
+            computed += len(chunk)
+            last_id = chunk[-1]
+
+        ProductAssociation.objects.filter(kind=self.kind, product__deleted_at__isnull=False).delete()
+        ProductAssociation.objects.filter(kind=self.kind, other__deleted_at__isnull=False).delete()
+
+        return computed
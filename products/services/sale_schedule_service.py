@@ -0,0 +1,80 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from products.services.pricing_service import PricingService
+
+
+class SaleScheduleService:
+    """
+    Moves products between sale states using a time-ordered queue of their
+    upcoming sale_start and sale_end, so each run only touches products
+    with a transition that is due.
+    """
+
+    batch_size = 1000
+
+    def schedule(self, product, now=None):
+        """Replace the queued transitions of one product after its window changed"""
+        from products.models import ProductSaleTransition, SaleState
+
+        now = now or timezone.now()
+        sale_start, sale_end = product.get_sale_window()
+
+        transitions = []
+        if sale_start and sale_end:
+            if sale_start > now:
+                transitions.append(ProductSaleTransition(product=product, run_at=sale_start, state=SaleState.active))
+            if sale_end > now:
+                transitions.append(ProductSaleTransition(product=product, run_at=sale_end, state=SaleState.ended))
+
+        ProductSaleTransition.objects.filter(product=product).delete()
+        ProductSaleTransition.objects.bulk_create(transitions)
+
+    def apply_due(self, now=None):
+        """Apply one batch of due transitions, returns the ids of the products moved"""
+        from products.models import Product, ProductSaleTransition
+
+        now = now or timezone.now()
+        due = list(
+            ProductSaleTransition.objects.filter(run_at__lte=now).order_by("run_at", "pk").values_list(
+                "pk", "product_id", "state"
+            )[:self.batch_size]
+        )
+        if not due:
+            return []
+
+        # ordered by run_at, so the last due transition of a product wins
+        latest = {product_id: state for _, product_id, state in due}
+        by_state = defaultdict(list)
+        for product_id, state in latest.items():
+            by_state[state].append(product_id)
+
+        with transaction.atomic():
+            for state, product_ids in by_state.items():
+                Product.objects.filter(pk__in=product_ids).update(sale_state=state, updated_at=now)
+            ProductSaleTransition.objects.filter(pk__in=[pk for pk, _, _ in due]).delete()
+
+        return list(latest)
+
+    def run(self):
+        """Apply everything that is due, then refresh prices and search for those products only"""
+        from products.models import Product
+
+        pricing = PricingService()
+        moved = []
+        while True:
+            product_ids = self.apply_due()
+            if not product_ids:
+                break
+
+            pricing.refresh(Product.objects.filter(pk__in=product_ids))
+            moved.extend(product_ids)
+
+        # sale_state and updated_at changed for all of them, even when the
+        # price did not
+        moved = list(dict.fromkeys(moved))
+        pricing.reindex(moved)
+
+        return moved
@@ -0,0 +1,103 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from services.log import AppLogger
+
+
+class SearchAnalyticsService:
+    """Loads spooled search events into SearchQueryLog and reports on them"""
+
+    batch_size = 1000
+
+    def ingest(self, paths):
+        """
+        Bulk insert spool files, deleting each one once it is stored. Each
+        file is claimed first, so overlapping runs never count one twice.
+        """
+        from products.models import SearchQueryLog
+        from products.search_analytics import claim_spool_file
+
+        ingested = 0
+        for path in paths:
+            path = claim_spool_file(path)
+            if path is None:
+                continue
+
+            rows = []
+            with open(path, encoding="utf-8") as spool:
+                for line in spool:
+                    try:
+                        event = json.loads(line)
+                        rows.append(SearchQueryLog(
+                            kind=event["kind"],
+                            query=event["query"],
+                            filters=event.get("filters"),
+                            hits=event.get("hits") or 0,
+                            took_ms=event.get("took_ms"),
+                            latency_ms=event["latency_ms"],
+                            backend=event["backend"],
+                            created_at=parse_datetime(event["created_at"]),
+                        ))
+                    except (ValueError, KeyError, TypeError) as e:
+                        # a process killed mid-write leaves a truncated last line
+                        AppLogger.warning(f"Skipping malformed search event in {path.name}: {e}")
+
+            with transaction.atomic():
+                SearchQueryLog.objects.bulk_create(rows, batch_size=self.batch_size)
+                path.unlink()
+
+            ingested += len(rows)
+
+        return ingested
+
+    def prune(self, days=None):
+        from products.models import SearchQueryLog
+
+        days = days or settings.SEARCH_ANALYTICS_RETENTION_DAYS
+        deleted, _ = SearchQueryLog.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=days)
+        ).delete()
+
+        return deleted
+
+    def get_queryset(self, days=7, kind=None):
+        from products.models import SearchQueryLog
+
+        queryset = SearchQueryLog.objects.filter(created_at__gte=timezone.now() - timedelta(days=days))
+        if kind:
+            queryset = queryset.filter(kind=kind)
+
+        return queryset
+
+    def top_queries(self, queryset, limit=20):
+        return list(
+            queryset.values("query").annotate(
+                searches=Count("id"), zero_results=Count("id", filter=Q(hits=0))
+            ).order_by("-searches")[:limit]
+        )
+
+    def zero_result_queries(self, queryset, limit=20):
+        return list(
+            queryset.filter(hits=0).values("query").annotate(
+                searches=Count("id")
+            ).order_by("-searches")[:limit]
+        )
+
+    def percentiles(self, queryset, field, points=(50, 95, 99)):
+        """Nearest-rank percentiles, one OFFSET query each"""
+        queryset = queryset.exclude(**{f"{field}__isnull": True})
+        total = queryset.count()
+        if not total:
+            return {point: None for point in points}
+
+        ordered = queryset.order_by(field).values_list(field, flat=True)
+        return {
+            point: ordered[max(-(-point * total // 100) - 1, 0)]
+            for point in points
+        }
@@ -0,0 +1,410 @@
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from elasticsearch.helpers import bulk, parallel_bulk, scan
+
+from services.log import AppLogger
+
+
+class IndexingReport:
+    """Counters and per-stage timings collected while building an index"""
+
+    def __init__(self):
+        self.docs = 0
+        self.errors = 0
+        self.deleted = 0
+        self.fetch_seconds = 0.0
+        self.prepare_seconds = 0.0
+        self.source_seconds = 0.0
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def bulk_seconds(self):
+        # time parallel_bulk spent waiting on elasticsearch rather than on us
+        return max(self.elapsed - self.source_seconds, 0.0)
+
+    @property
+    def docs_per_second(self):
+        return self.docs / self.elapsed if self.elapsed else 0.0
+
+    def as_lines(self):
+        return [
+            f"Indexed {self.docs} documents ({self.errors} errors), deleted {self.deleted} in {self.elapsed:.2f}s",
+            f"Throughput: {self.docs_per_second:.1f} docs/sec",
+            f"  fetch   (db, streamed):      {self.fetch_seconds:.2f}s",
+            f"  prepare (worker pool, cpu):  {self.prepare_seconds:.2f}s",
+            f"  bulk    (waiting on es):     {self.bulk_seconds:.2f}s",
+        ]
+
+
+class SearchIndexService:
+    """
+    Streams a document's queryset into Elasticsearch.
+
+    Rows are read with ``iterator(chunk_size=...)`` so prefetching happens per
+    chunk, documents are built in a thread pool while the next chunk is being
+    fetched, and the resulting actions are sent through ``parallel_bulk``.
+
+    The document's ``Index.name`` is used as an alias. Every rebuild goes to a
+    new versioned index which only replaces the live one, in a single atomic
+    alias update, once its document count has been verified.
+
+    The live index carries the hash of the mapping it was built with and the
+    database high-water mark (max ``updated_at`` and id) it reflects in its
+    ``_meta``, which lets ``sync`` skip work when nothing has changed.
+
+    The high-water mark only sees rows that were added or saved. Tag, colour
+    and subcategory changes bump ``Product.updated_at`` (products.signals),
+    and hard-deleted rows are found by ``delete_missing``.
+    """
+
+    def __init__(self, document=None, chunk_size=None, bulk_chunk_size=None, workers=None, thread_count=None):
+        from products.documents import ProductDocument
+
+        self.document = (document or ProductDocument)()
+        self.chunk_size = chunk_size or settings.SEARCH_INDEX_CHUNK_SIZE
+        self.bulk_chunk_size = bulk_chunk_size or settings.SEARCH_INDEX_BULK_CHUNK_SIZE
+        self.workers = workers or settings.SEARCH_INDEX_WORKERS
+        self.thread_count = thread_count or settings.SEARCH_INDEX_BULK_THREADS
+        self.report = IndexingReport()
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        return self.document._index
+
+    @property
+    def connection(self):
+        return self.document._get_connection()
+
+    @property
+    def alias(self):
+        return self.index._name
+
+    def new_index_name(self):
+        return f"{self.alias}-{timezone.now().strftime('%Y%m%d%H%M%S%f')}"
+
+    def get_live_indices(self):
+        """Physical indices currently behind the alias"""
+        if not self.connection.indices.exists_alias(name=self.alias):
+            return []
+        return list(self.connection.indices.get_alias(name=self.alias).keys())
+
+    def get_stale_indices(self, keep=()):
+        """Versioned indices left behind by earlier or failed rebuilds"""
+        indices = self.connection.indices.get(index=f"{self.alias}-*", ignore_unavailable=True)
+        return [name for name in indices.keys() if name not in keep]
+
+    def get_queryset(self):
+        return self.document.get_queryset().order_by("pk")
+
+    def get_mapping_hash(self):
+        body = json.dumps(self.index.to_dict(), sort_keys=True, default=str)
+        return hashlib.sha256(body.encode()).hexdigest()
+
+    def get_watermark(self):
+        # both aggregates are answered from an index, so this stays cheap
+        # however large the table is
+        watermark = self.document.django.model._default_manager.aggregate(
+            max_id=Max("pk"), max_updated_at=Max("updated_at")
+        )
+        if watermark["max_updated_at"]:
+            watermark["max_updated_at"] = watermark["max_updated_at"].isoformat()
+
+        return watermark
+
+    def get_index_meta(self):
+        mappings = self.connection.indices.get_mapping(index=self.alias)
+        for body in mappings.values():
+            return body["mappings"].get("_meta", {})
+        return {}
+
+    def save_index_meta(self, index_name, watermark):
+        meta = {"mapping_hash": self.get_mapping_hash(), **watermark}
+        self.connection.indices.put_mapping(index=index_name, meta=meta)
+
+    def get_changed_queryset(self, meta):
+        q = Q(pk__gt=meta.get("max_id") or 0)
+
+        max_updated_at = parse_datetime(meta.get("max_updated_at") or "")
+        if max_updated_at:
+            q |= Q(updated_at__gt=max_updated_at)
+
+        return self.get_queryset().filter(q)
+
+    def delete_missing(self):
+        """
+        Remove the documents whose rows are gone from the database, returns
+        how many. The index ids are only walked when its document count
+        differs from the database's.
+        """
+        self.connection.indices.refresh(index=self.alias)
+        if self.connection.count(index=self.alias)["count"] == self.get_queryset().count():
+            return 0
+
+        hits = scan(self.connection, index=self.alias, query={"query": {"match_all": {}}}, _source=False)
+        indexed = (hit["_id"] for hit in hits)
+
+        missing = []
+        while chunk := list(islice(indexed, self.chunk_size)):
+            existing = {str(pk) for pk in self.get_queryset().filter(pk__in=chunk).values_list("pk", flat=True)}
+            missing.extend(doc_id for doc_id in chunk if doc_id not in existing)
+
+        actions = ({"_op_type": "delete", "_index": self.alias, "_id": doc_id} for doc_id in missing)
+        _, errors = bulk(self.connection, actions, chunk_size=self.bulk_chunk_size, raise_on_error=False)
+        for error in errors[:10]:
+            AppLogger.error(f"Failed to delete document: {error}")
+
+        return len(missing) - len(errors)
+
+    def _iter_chunks(self, queryset):
+        rows = queryset.iterator(chunk_size=self.chunk_size)
+        while True:
+            started = time.perf_counter()
+            chunk = list(islice(rows, self.chunk_size))
+            self.report.fetch_seconds += time.perf_counter() - started
+
+            if not chunk:
+                return
+            yield chunk
+
+    def _prepare_chunk(self, chunk, index_name):
+        started = time.perf_counter()
+        actions = []
+        for instance in chunk:
+            if not self.document.should_index_object(instance):
+                continue
+            action = self.document._prepare_action(instance, "index")
+            action["_index"] = index_name
+            actions.append(action)
+
+        with self._lock:
+            self.report.prepare_seconds += time.perf_counter() - started
+
+        return actions
+
+    def _iter_actions(self, queryset, index_name):
+        # keep a bounded number of chunks in flight so memory stays flat no
+        # matter how large the catalog is
+        max_pending = self.workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="search-index") as executor:
+            pending = deque()
+            for chunk in self._iter_chunks(queryset):
+                pending.append(executor.submit(self._prepare_chunk, chunk, index_name))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+    def _timed(self, actions):
+        while True:
+            started = time.perf_counter()
+            try:
+                action = next(actions)
+            except StopIteration:
+                return
+            finally:
+                self.report.source_seconds += time.perf_counter() - started
+
+            yield action
+
+    def populate(self, queryset=None, index_name=None):
+        if queryset is None:
+            queryset = self.get_queryset()
+        index_name = index_name or self.index._name
+
+        results = parallel_bulk(
+            self.connection,
+            self._timed(self._iter_actions(queryset, index_name)),
+            thread_count=self.thread_count,
+            chunk_size=self.bulk_chunk_size,
+            raise_on_error=False,
+        )
+
+        for ok, item in results:
+            if ok:
+                self.report.docs += 1
+                continue
+
+            self.report.errors += 1
+            if self.report.errors <= 10:
+                AppLogger.error(f"Failed to index document: {item}")
+
+        self.report.finish()
+
+        return self.report
+
+    def iter_related_product_ids(self, related_model, related_pk):
+        """Walk the ids of products pointing at a related object in fixed-size chunks"""
+        lookup, _ = self.document.related_fields[related_model]
+        queryset = self.document.django.model._default_manager.filter(**{lookup: related_pk})
+
+        last_id = 0
+        while True:
+            ids = list(
+                queryset.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:self.chunk_size]
+            )
+            if not ids:
+                return
+            yield ids
+            last_id = ids[-1]
+
+    def iter_related_chunks(self, related_model, related_pk, product_ids=None):
+        if product_ids is None:
+            return self.iter_related_product_ids(related_model, related_pk)
+        return (product_ids[i:i + self.chunk_size] for i in range(0, len(product_ids), self.chunk_size))
+
+    def update_related_chunk(self, related_model, ids):
+        """
+        Refresh only the embedded fields of these products that depend on a
+        changed category, subcategory, brand or tag, as partial bulk updates.
+        """
+        _, field_names = self.document.related_fields[related_model]
+
+        started = time.perf_counter()
+        products = list(self.document.get_queryset().filter(pk__in=ids))
+        self.report.fetch_seconds += time.perf_counter() - started
+
+        actions = [
+            {
+                "_op_type": "update",
+                "_index": self.alias,
+                "_id": product.pk,
+                "doc": self.document.prepare_partial(product, field_names),
+            }
+            for product in products
+        ]
+
+        success, errors = bulk(
+            self.connection, actions, chunk_size=self.bulk_chunk_size, raise_on_error=False
+        )
+        self.report.docs += success
+        self.report.errors += len(errors)
+        for error in errors[:10]:
+            AppLogger.error(f"Failed to update document: {error}")
+
+        return self.report
+
+    def create_index(self, index_name):
+        index = self.index.clone(name=index_name)
+        # refreshing while bulk loading only slows the build down, it is turned
+        # back on before the index is verified
+        index.settings(refresh_interval="-1")
+        index.create()
+
+        return index
+
+    def verify_index(self, index_name, expected):
+        self.connection.indices.put_settings(index=index_name, settings={"refresh_interval": None})
+        self.connection.indices.refresh(index=index_name)
+
+        indexed = self.connection.count(index=index_name)["count"]
+
+        if self.report.errors:
+            return f"{self.report.errors} documents failed to index"
+        if indexed != self.report.docs:
+            return f"Index holds {indexed} documents but {self.report.docs} were sent"
+        if indexed < expected:
+            return f"Index holds {indexed} documents, expected at least {expected}"
+
+        return None
+
+    def swap_alias(self, index_name):
+        live = self.get_live_indices()
+        actions = [{"add": {"index": index_name, "alias": self.alias}}]
+        actions += [{"remove": {"index": name, "alias": self.alias}} for name in live]
+
+        # an index created before aliases were introduced occupies the alias
+        # name, drop it in the same atomic update
+        if not live and self.connection.indices.exists(index=self.alias):
+            actions.append({"remove_index": {"index": self.alias}})
+
+        self.connection.indices.update_aliases(actions=actions)
+
+        return live
+
+    def rebuild(self, keep_old=False):
+        # taken before reading any rows so changes made during the build are
+        # picked up by the next sync
+        watermark = self.get_watermark()
+        queryset = self.get_queryset()
+        expected = queryset.count()
+        index_name = self.new_index_name()
+
+        self.create_index(index_name)
+        self.populate(queryset=queryset, index_name=index_name)
+
+        error = self.verify_index(index_name, expected)
+        if error:
+            self.connection.indices.delete(index=index_name, ignore_unavailable=True)
+            return None, error
+
+        self.save_index_meta(index_name, watermark)
+        self.swap_alias(index_name)
+
+        if not keep_old:
+            for stale in self.get_stale_indices(keep=[index_name]):
+                self.connection.indices.delete(index=stale, ignore_unavailable=True)
+
+        return index_name, None
+
+    def sync(self, max_incremental=None, keep_old=False):
+        """
+        Bring the index up to date with the least work possible.
+
+        Returns ``(action, error)`` where action is one of ``skipped``,
+        ``incremental`` or ``rebuilt``.
+        """
+        if max_incremental is None:
+            max_incremental = settings.SEARCH_INDEX_MAX_INCREMENTAL
+
+        if not self.get_live_indices():
+            _, error = self.rebuild(keep_old=keep_old)
+            return "rebuilt", error
+
+        meta = self.get_index_meta()
+        if meta.get("mapping_hash") != self.get_mapping_hash():
+            _, error = self.rebuild(keep_old=keep_old)
+            return "rebuilt", error
+
+        watermark = self.get_watermark()
+        changed = self.get_changed_queryset(meta)
+        changed_count = changed.count()
+
+        if changed_count > max_incremental:
+            _, error = self.rebuild(keep_old=keep_old)
+            return "rebuilt", error
+
+        if changed_count:
+            self.populate(queryset=changed, index_name=self.alias)
+            if self.report.errors:
+                return "incremental", f"{self.report.errors} documents failed to index"
+
+        self.report.deleted = self.delete_missing()
+        self.report.finish()
+        if not changed_count and not self.report.deleted:
+            return "skipped", None
+
+        for index_name in self.get_live_indices():
+            self.save_index_meta(index_name, watermark)
+
+        return "incremental", None
@@ -0,0 +1,160 @@
+import re
+import zlib
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+
+
+class SimilarityService:
+    """
+    Offline "similar products" from TF-IDF vectors of the product text,
+    stored as ProductAssociation rows so lookups need neither Elasticsearch
+    nor any scoring at request time.
+
+    Terms that only one product uses cannot make two products similar, so
+    only the shared terms are kept, feature-hashed into ``dimensions``
+    columns of a dense float32 matrix. Their idf and the vector norms are
+    exact. Cosine scores are then computed block against block with plain
+    matrix products, keeping a running top-K per row, so memory is bounded
+    by the matrix plus two blocks rather than by all pairs.
+    """
+
+    name_weight = 2
+
+    def __init__(self, top_k=None, dimensions=None, block_size=None):
+        from products.models import AssociationKind
+
+        self.kind = AssociationKind.similar
+        self.top_k = top_k or settings.SIMILAR_PRODUCTS_TOP_K
+        self.dimensions = dimensions or settings.SIMILAR_PRODUCTS_DIMENSIONS
+        self.block_size = block_size or settings.SIMILAR_PRODUCTS_BLOCK_SIZE
+        self.min_score = settings.SIMILAR_PRODUCTS_MIN_SCORE
+
+    def tokenize(self, text):
+        return TOKEN_RE.findall((text or "").lower())
+
+    def iter_documents(self):
+        """Yield ``(product_id, name, body)`` for live products, body being
+        the short description, category and tags"""
+        from products.models import Product
+
+        tags = defaultdict(list)
+        for product_id, tag in Product.tags.through.objects.filter(
+            product__deleted_at__isnull=True
+        ).values_list("product_id", "tag__name").iterator(chunk_size=5000):
+            tags[product_id].append(tag)
+
+        rows = Product.available_objects.order_by("pk").values_list(
+            "pk", "name", "short_description", "category__name"
+        )
+        for product_id, name, short_description, category in rows.iterator(chunk_size=2000):
+            yield product_id, name, " ".join(filter(None, [short_description, category, *tags.pop(product_id, [])]))
+
+    def vectorize(self, documents):
+        """Return the product ids and their L2 normalised ``(n, dimensions)`` matrix"""
+        ids, rows, terms, counts = [], [], [], []
+        vocabulary = {}
+        for row, (product_id, name, body) in enumerate(documents):
+            ids.append(product_id)
+            tf = Counter()
+            for token in self.tokenize(name):
+                tf[token] += self.name_weight
+            tf.update(self.tokenize(body))
+
+            for term, count in tf.items():
+                rows.append(row)
+                terms.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+
+        rows = np.asarray(rows, dtype=np.int64)
+        terms = np.asarray(terms, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.float32)
+
+        n = len(ids)
+        df = np.bincount(terms, minlength=len(vocabulary))
+        idf = np.log((1 + n) / (1 + df)).astype(np.float32) + 1
+        weights = (1 + np.log(counts)) * idf[terms]
+
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n)).astype(np.float32)
+        norms[norms == 0] = 1
+        weights /= norms[rows]
+
+        # a stable hash, Python's own is salted per process
+        hashes = np.fromiter((zlib.crc32(term.encode()) for term in vocabulary), dtype=np.uint32, count=len(vocabulary))
+        columns = (hashes % self.dimensions).astype(np.int64)
+        # signed hashing, colliding terms cancel out on average instead of adding up
+        signs = np.where(hashes >> 31, -1, 1).astype(np.float32)
+
+        shared = df[terms] > 1
+        matrix = np.zeros((n, self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (rows[shared], columns[terms[shared]]), weights[shared] * signs[terms[shared]])
+
+        return np.asarray(ids, dtype=np.int64), matrix
+
+    def neighbours(self, matrix):
+        """Yield ``(row_start, indices, scores)`` per block of rows, best first"""
+        n = len(matrix)
+        k = min(self.top_k, n - 1)
+        if k < 1:
+            return
+
+        for start in range(0, n, self.block_size):
+            block = matrix[start:start + self.block_size]
+            best_scores = np.full((len(block), k), -np.inf, dtype=np.float32)
+            best_indices = np.full((len(block), k), -1, dtype=np.int64)
+
+            for column_start in range(0, n, self.block_size):
+                scores = block @ matrix[column_start:column_start + self.block_size].T
+                if column_start == start:
+                    np.fill_diagonal(scores, -np.inf)
+
+                # the block's own top-K first, so the merge below stays k wide
+                if scores.shape[1] > k:
+                    columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                    scores = np.take_along_axis(scores, columns, axis=1)
+                else:
+                    columns = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+
+                candidates = np.concatenate([best_scores, scores], axis=1)
+                indices = np.concatenate([best_indices, columns + column_start], axis=1)
+
+                top = np.argpartition(-candidates, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(candidates, top, axis=1)
+                best_indices = np.take_along_axis(indices, top, axis=1)
+
+            order = np.argsort(-best_scores, axis=1, kind="stable")
+            yield start, np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def store(self, ids, start, indices, scores):
+        from products.models import ProductAssociation
+
+        block_ids = ids[start:start + len(indices)].tolist()
+        rows = []
+        for product_id, row_indices, row_scores in zip(block_ids, indices, scores):
+            keep = row_scores >= self.min_score
+            rows.extend(
+                ProductAssociation(kind=self.kind, product_id=product_id, other_id=other, rank=rank, score=score)
+                for rank, (other, score) in enumerate(zip(ids[row_indices[keep]].tolist(), row_scores[keep].tolist()), start=1)
+            )
+
+        with transaction.atomic():
+            ProductAssociation.objects.filter(kind=self.kind, product_id__in=block_ids).delete()
+            ProductAssociation.objects.bulk_create(rows, batch_size=1000)
+
+        return len(rows)
+
+    def rebuild(self):
+        from products.models import ProductAssociation
+
+        ids, matrix = self.vectorize(self.iter_documents())
+        for start, indices, scores in self.neighbours(matrix):
+            self.store(ids, start, indices, scores)
+
+        ProductAssociation.objects.filter(kind=self.kind, product__deleted_at__isnull=False).delete()
+        ProductAssociation.objects.filter(kind=self.kind, other__deleted_at__isnull=False).delete()
+
+        return len(ids)
@@ -0,0 +1,73 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from products.services.ranking_service import RankingService
+
+
+class TrendingService(RankingService):
+    """
+    Trending is the sum of hourly views and purchases, each bucket decayed
+    exponentially with its age, so a product has to keep getting attention
+    to stay on the list.
+    """
+
+    def __init__(self, top_n=None):
+        from products.models import RankingKind
+
+        super().__init__(top_n=top_n)
+        self.kind = RankingKind.trending
+        self.half_life_hours = settings.TRENDING_HALF_LIFE_HOURS
+        self.window_hours = settings.TRENDING_WINDOW_HOURS
+        self.purchase_weight = settings.TRENDING_PURCHASE_WEIGHT
+
+    def get_bucket(self, when=None):
+        return (when or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+    def record(self, product_id, views=0, purchases=0):
+        """Add to the product's current hourly bucket with a single atomic UPDATE"""
+        from products.models import ProductActivity
+
+        bucket = self.get_bucket()
+        increments = {"views": F("views") + views, "purchases": F("purchases") + purchases}
+
+        if ProductActivity.objects.filter(product_id=product_id, bucket=bucket).update(**increments):
+            return
+
+        try:
+            with transaction.atomic():
+                ProductActivity.objects.create(product_id=product_id, bucket=bucket, views=views, purchases=purchases)
+        except IntegrityError:
+            # another request opened the bucket first
+            ProductActivity.objects.filter(product_id=product_id, bucket=bucket).update(**increments)
+
+    def compute_scores(self, now=None):
+        from products.models import ProductActivity
+
+        now = now or timezone.now()
+        decay = math.log(2) / self.half_life_hours
+
+        scores = defaultdict(float)
+        rows = ProductActivity.objects.filter(
+            bucket__gte=now - timedelta(hours=self.window_hours)
+        ).values_list("product_id", "bucket", "views", "purchases")
+
+        for product_id, bucket, views, purchases in rows.iterator(chunk_size=self.chunk_size):
+            age_hours = max((now - bucket).total_seconds() / 3600, 0)
+            scores[product_id] += (views + self.purchase_weight * purchases) * math.exp(-decay * age_hours)
+
+        return scores
+
+    def prune(self, now=None):
+        """Drop buckets too old to move any score"""
+        from products.models import ProductActivity
+
+        now = now or timezone.now()
+        deleted, _ = ProductActivity.objects.filter(bucket__lt=now - timedelta(hours=self.window_hours)).delete()
+
+        return deleted
@@ -1,7 +1,7 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import F, Q, Prefetch, OuterRef, Subquery, Case, When, ExpressionWrapper, DecimalField
+from django.db.models import F, Q, Prefetch, OuterRef, Subquery
 
-from media.models import Upload
+from media.models import Upload, UploadStatus
 from products.services.product_service import ProductService
 from services.util import CustomRequestUtil
 
@@ -37,30 +37,17 @@ class WishlistService(CustomRequestUtil, LoginRequiredMixin):
         q = Q(user=self.auth_user)
 
         first_media = Upload.objects.filter(
-            product=OuterRef("product_id")
+            product=OuterRef("product_id"), status=UploadStatus.ready
         ).order_by("created_at").values("image")[:1]
 
         return Wishlist.objects.filter(q).annotate(
             first_media=Subquery(first_media),
-            discounted_price=Case(
-                When(
-                    product__percentage_discount__isnull=False,
-                    product__percentage_discount__gt=0,
-                    then=ExpressionWrapper(
-                        F('product__price')
-                        - ((F('product__percentage_discount') * F("product__price")) / 100),
-                        output_field=DecimalField(max_digits=15, decimal_places=2),
-                    ),
-                ),
-                default=F("product__price"),
-                output_field=DecimalField(max_digits=15, decimal_places=2),
-            ),
         ).values(
             "product_id",
             name=F("product__name"), stock=F("product__stock"),
             price=F("product__price"), slug=F("product__slug"),
             first_media=F("first_media"), category=F("product__category__name"),
-            discounted_price=F("discounted_price"),
+            discounted_price=F("product__effective_price"),
             percentage_discount=F("product__percentage_discount")
 
         ).order_by('-created_at')
@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, pre_delete, m2m_changed
+from django.utils import timezone
+
+from products.documents import ProductDocument
+from products.models import Product
+from products.search_backends import DatabaseSearchBackend, SEARCH_TEXT_FIELDS
+from products.tasks import reindex_related_products, refresh_related_products
+
+
+def search_sync_enabled():
+    return getattr(settings, "ELASTICSEARCH_DSL_AUTOSYNC", True)
+
+
+def queue_related_reindex(sender, instance, **kwargs):
+    if not search_sync_enabled():
+        return
+
+    transaction.on_commit(
+        lambda: reindex_related_products.delay(sender._meta.label, instance.pk)
+    )
+
+
+def queue_related_reindex_before_delete(sender, instance, **kwargs):
+    # the relation is gone once the delete runs, so collect the affected ids
+    # now (ids only) and let the job rebuild their fields afterwards
+    if not search_sync_enabled():
+        return
+
+    related_pk = instance.pk
+    lookup, _ = ProductDocument.related_fields[sender]
+    product_ids = list(
+        ProductDocument.django.model._default_manager.filter(**{lookup: instance.pk}).values_list("pk", flat=True)
+    )
+    if not product_ids:
+        return
+
+    chunk_size = settings.SEARCH_INDEX_CHUNK_SIZE
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start:start + chunk_size]
+        transaction.on_commit(
+            lambda chunk=chunk: reindex_related_products.delay(sender._meta.label, related_pk, chunk)
+        )
+
+
+for related_model in ProductDocument.related_fields:
+    post_save.connect(queue_related_reindex, sender=related_model, dispatch_uid=f"reindex-{related_model.__name__}")
+    pre_delete.connect(
+        queue_related_reindex_before_delete, sender=related_model,
+        dispatch_uid=f"reindex-before-delete-{related_model.__name__}"
+    )
+
+
+def sync_search_text(sender, instance, update_fields=None, **kwargs):
+    # views, rating and stock bumps don't change any searchable text
+    if update_fields and not SEARCH_TEXT_FIELDS.intersection(update_fields):
+        return
+
+    transaction.on_commit(lambda: DatabaseSearchBackend().index_products([instance.pk]))
+
+
+def remember_cleared_products(sender, instance, action, reverse, **kwargs):
+    # pk_set is None on clear, so the products of a cleared tag or
+    # subcategory are read while their rows are still there
+    if action == "pre_clear" and reverse:
+        instance._cleared_product_ids = list(instance.products.values_list("pk", flat=True))
+
+
+def get_changed_product_ids(instance, action, reverse, pk_set):
+    if not reverse:
+        return [instance.pk]
+    if action == "post_clear":
+        return getattr(instance, "_cleared_product_ids", [])
+    return list(pk_set or [])
+
+
+def sync_search_text_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    product_ids = get_changed_product_ids(instance, action, reverse, pk_set)
+    if product_ids:
+        transaction.on_commit(lambda: DatabaseSearchBackend().index_products(product_ids))
+
+
+def touch_products_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    # a relation change doesn't save the product, the bumped updated_at is
+    # what lets SearchIndexService.sync pick it up
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    product_ids = get_changed_product_ids(instance, action, reverse, pk_set)
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+
+
+post_save.connect(sync_search_text, sender=Product, dispatch_uid="sync-search-text")
+for through in (Product.tags.through, Product.sub_categories.through, Product.colors.through):
+    m2m_changed.connect(
+        remember_cleared_products, sender=through, dispatch_uid=f"remember-cleared-products-{through.__name__}"
+    )
+    m2m_changed.connect(touch_products_m2m, sender=through, dispatch_uid=f"touch-products-{through.__name__}")
+for through in (Product.tags.through, Product.sub_categories.through):
+    m2m_changed.connect(sync_search_text_m2m, sender=through, dispatch_uid=f"sync-search-text-{through.__name__}")
+
+
+def track_category_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "category" not in update_fields:
+        instance._category_changed = False
+        return
+
+    instance._category_changed = instance.pk is None or instance.has_changed("category")
+
+
+def queue_related_products_refresh(sender, instance, **kwargs):
+    if not getattr(instance, "_category_changed", False):
+        return
+
+    transaction.on_commit(lambda: refresh_related_products.delay([instance.pk]))
+
+
+def queue_related_products_refresh_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    product_ids = get_changed_product_ids(instance, action, reverse, pk_set)
+    if product_ids:
+        transaction.on_commit(lambda: refresh_related_products.delay(product_ids))
+
+
+pre_save.connect(track_category_change, sender=Product, dispatch_uid="track-category-change")
+post_save.connect(queue_related_products_refresh, sender=Product, dispatch_uid="refresh-related-products")
+m2m_changed.connect(
+    queue_related_products_refresh_m2m, sender=Product.tags.through, dispatch_uid="refresh-related-products-tags"
+)
@@ -0,0 +1,101 @@
+from celery import shared_task
+from django.apps import apps
+
+
+@shared_task
+def reindex_related_products(model_label, related_pk, product_ids=None):
+    from products.search_backends import DatabaseSearchBackend
+    from products.services.search_index_service import SearchIndexService
+    from services.log import AppLogger
+
+    related_model = apps.get_model(model_label)
+    service = SearchIndexService()
+    fallback = DatabaseSearchBackend()
+
+    for ids in service.iter_related_chunks(related_model, related_pk, product_ids=product_ids):
+        # the fallback first, it is what gets served while Elasticsearch is down
+        fallback.index_products(ids)
+        try:
+            service.update_related_chunk(related_model, ids)
+        except Exception:
+            AppLogger.exception(f"Failed to reindex products {ids[0]}..{ids[-1]} after a {model_label} change")
+
+    return None
+
+
+@shared_task
+def ingest_search_queries():
+    from products.search_analytics import get_ready_spool_files
+    from products.services.search_analytics_service import SearchAnalyticsService
+
+    service = SearchAnalyticsService()
+    ingested = service.ingest(get_ready_spool_files())
+    service.prune()
+
+    return ingested
+
+
+@shared_task
+def refresh_effective_prices():
+    from products.services.pricing_service import PricingService
+
+    service = PricingService()
+    product_ids = service.refresh(service.get_stale_queryset())
+    service.reindex(product_ids)
+
+    return len(product_ids)
+
+
+@shared_task
+def apply_sale_transitions():
+    from products.services.sale_schedule_service import SaleScheduleService
+
+    return len(SaleScheduleService().run())
+
+
+@shared_task
+def rebuild_related_products():
+    from products.services.related_products_service import RelatedProductsService
+
+    return RelatedProductsService().rebuild()
+
+
+@shared_task
+def refresh_related_products(product_ids):
+    from products.services.related_products_service import RelatedProductsService
+
+    return RelatedProductsService().refresh(product_ids)
+
+
+@shared_task
+def refresh_trending_products():
+    from products.services.trending_service import TrendingService
+
+    service = TrendingService()
+    stored = service.refresh()
+    service.prune()
+
+    return stored
+
+
+@shared_task
+def refresh_best_sellers():
+    from products.services.best_seller_service import BestSellerService, SalesRollupService
+
+    SalesRollupService().rollup()
+
+    return {days: BestSellerService(days=days).refresh() for days in (7, 30)}
+
+
+@shared_task
+def update_copurchases():
+    from products.services.copurchase_service import CoPurchaseService
+
+    return CoPurchaseService().run()
+
+
+@shared_task
+def rebuild_similar_products():
+    from products.services.similarity_service import SimilarityService
+
+    return SimilarityService().rebuild()
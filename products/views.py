@@ -7,7 +7,7 @@ from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
 from accounts.services.vendor_service import VendorService
-from products.models import Wishlist, Subcategory
+from products.models import Wishlist, Subcategory, RankingScope
 from products.search import ProductSearch
 from products.services.category_brand_service import CategoryService, ColorService, BrandService, TagService, \
     SubcategoryService
@@ -44,10 +44,13 @@ class RetrieveProductView(View, CustomRequestUtil):
         product_service = ProductService(self.request)
         product, error = product_service.fetch_single_by_slug(kwargs.get("product_slug"))
 
-        related_products = product_service.get_related_products(product.id)[:5]
+        related_products = product_service.get_related_products(product)
+        frequently_bought_together = product_service.get_frequently_bought_together([product.id])
         ratings_data = product_service.fetch_product_ratings(product.id)
         avg_rating = round(ratings_data.get('avg_rating', 0), 1)
-        trending_products = product_service.fetch_list().order_by("-views").exclude(id=product.id)[:5]
+        trending_products = product_service.get_trending_products(
+            scope=RankingScope.category, scope_id=product.category_id, limit=5, exclude=product.id
+        )
         reviews = product.reviews.all().order_by('-created_at')[:3]
 
         product_service.update_product_views(product)
@@ -55,6 +58,7 @@ class RetrieveProductView(View, CustomRequestUtil):
         self.extra_context_data = {
             "title": product.name,
             "related_products": related_products,
+            "frequently_bought_together": frequently_bought_together,
             'ratings_data': {**ratings_data, 'avg_rating': avg_rating},
             'rating_range': range(1, 6),
             'trending_products': trending_products,
@@ -113,6 +117,9 @@ class ListProductView(View, CustomRequestUtil):
             self.extra_context_data['title'] = f"{subcategory}"
         product_service = ProductService(self.request)
 
+        self.extra_context_data['facets'] = ProductSearch.facets(
+            filters={'category': category, 'subcategory': subcategory}
+        )
 
         return self.process_request(
             request, target_function=product_service.fetch_list,
@@ -432,7 +439,9 @@ class ProductSearchView(View, CustomRequestUtil):
         - brand: Brand ID or name
         - min_price: Minimum price
         - max_price: Maximum price
+        - subcategory: Subcategory name
         - tags: Comma-separated tag names
+        - colors: Comma-separated color names
         - in_stock: true/false
         - sort: relevance|price_asc|price_desc|newest
         - page: Page number (default: 1)
@@ -444,7 +453,9 @@ class ProductSearchView(View, CustomRequestUtil):
             brand = request.GET.get('brand', None)
             min_price = request.GET.get('min_price', None)
             max_price = request.GET.get('max_price', None)
+            subcategory = request.GET.get('subcategory', None)
             tags = request.GET.get('tags', None)
+            colors = request.GET.get('colors', None)
             in_stock = request.GET.get('in_stock', None)
             sort_by = request.GET.get('sort', 'relevance')
             page = int(request.GET.get('page', 1))
@@ -457,6 +468,8 @@ class ProductSearchView(View, CustomRequestUtil):
                 max_price = float(max_price)
             if tags:
                 tags = [tag.strip() for tag in tags.split(',')]
+            if colors:
+                colors = [color.strip() for color in colors.split(',')]
             if in_stock:
                 in_stock = in_stock.lower() == 'true'
 
@@ -473,12 +486,26 @@ class ProductSearchView(View, CustomRequestUtil):
             except (ValueError, AttributeError):
                 pass
 
-            # Perform search
-            results = ProductSearch.search_products(
+            filters = {
+                'category': category,
+                'subcategory': subcategory,
+                'brand': brand,
+                'tags': tags,
+                'colors': colors,
+                'min_price': min_price,
+                'max_price': max_price,
+                'in_stock': in_stock,
+            }
+
+            # Perform search, facet counts come back with the hits
+            response = ProductSearch.faceted_search(
                 query=query,
+                filters={key: value for key, value in filters.items() if value},
+                size=page_size,
             )
 
-            self.extra_context_data["results"] = results
+            self.extra_context_data["results"] = response["results"]
+            self.extra_context_data["facets"] = response["facets"]
 
             return self.process_request(request)
 
@@ -522,3 +549,43 @@ class ProductAutocompleteView(View):
                 'error': str(e)
             }, status=400)
 
+
+
+class HeaderSearchView(View):
+    """API view for the grouped header search dropdown"""
+
+    def get(self, request):
+        """
+        GET /api/search/header/
+
+        Query parameters:
+        - q: Search query (required)
+        - products, categories, brands, vendors: Per-group limits (optional)
+        """
+        try:
+            query = request.GET.get('q', '')
+
+            if not query:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Query parameter "q" is required'
+                }, status=400)
+
+            sizes = {
+                group: min(int(request.GET[group]), 20)
+                for group in ('products', 'categories', 'brands', 'vendors')
+                if group in request.GET
+            }
+
+            results = ProductSearch.header_search(query, sizes)
+
+            return JsonResponse({
+                'success': True,
+                'results': results
+            })
+
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
@@ -0,0 +1,36 @@
+from django.db.models import Exists, OuterRef
+
+
+def related_exists(model, relation, **lookups):
+    """
+    An ``Exists()`` filter for ``model`` rows with at least one row through
+    the multi-valued ``relation`` (a many-to-many or a reverse foreign key)
+    matching ``lookups``.
+
+    Filtering across such a relation with a join repeats the row once per
+    match, which then takes a ``distinct()`` over the whole (annotated) row
+    to fold back. The subquery is a semi-join instead, each row comes back
+    once and the database can stop at the first match.
+
+        Product.objects.filter(related_exists(Product, "tags", name__in=["new", "sale"]))
+        Order.objects.filter(related_exists(Order, "items", product__created_by=user))
+    """
+    field = model._meta.get_field(relation)
+
+    if field.many_to_many:
+        # straight on the join table, the related table is only joined when
+        # the lookups reach into it
+        m2m = field if field.concrete else field.remote_field
+        source, target = m2m.m2m_field_name(), m2m.m2m_reverse_field_name()
+        if not field.concrete:
+            source, target = target, source
+
+        queryset = m2m.remote_field.through._base_manager.filter(
+            **{source: OuterRef("pk")}, **{f"{target}__{lookup}": value for lookup, value in lookups.items()}
+        )
+    elif field.one_to_many:
+        queryset = field.related_model._base_manager.filter(**{field.field.name: OuterRef("pk")}, **lookups)
+    else:
+        raise ValueError(f"{model.__name__}.{relation} is not a multi-valued relation, filter on it directly")
+
+    return Exists(queryset)
@@ -8,7 +8,7 @@
 
     // Configuration
     const CONFIG = {
-        autocompleteUrl: '/api/search/autocomplete/',
+        headerSearchUrl: '/api/search/header/',
         searchResultsUrl: '/search/',
         debounceDelay: 500,
         minChars: 2,
@@ -143,12 +143,13 @@
     /** Fetch suggestions from API */
     async function fetchSuggestions(query, suggestionsBox) {
         try {
-            const url = `${CONFIG.autocompleteUrl}?q=${encodeURIComponent(query)}&size=${CONFIG.maxSuggestions}`;
+            // products, categories, brands and vendors come back together
+            const url = `${CONFIG.headerSearchUrl}?q=${encodeURIComponent(query)}&products=${CONFIG.maxSuggestions}`;
             const response = await fetch(url);
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
             const data = await response.json();
-            if (data.success && data.suggestions) {
-                displaySuggestions(data.suggestions, query, suggestionsBox);
+            if (data.success && data.results) {
+                displaySuggestions(data.results, query, suggestionsBox);
             } else {
                 showNoResults(suggestionsBox);
             }
@@ -169,10 +170,26 @@
         }).format(amount);
     }
 
+    /** Render a group of category, brand or vendor links */
+    function renderGroup(title, items, query) {
+        if (!items || !items.length) return '';
+
+        let html = `<div class="suggestion-group-title text-muted small px-2 pt-2">${title}</div>`;
+        items.forEach(item => {
+            html += `
+                <div class="suggestion-item" data-url="${escapeHtml(item.url)}" data-query="${escapeHtml(item.name)}">
+                    <div class="p-2">${highlightMatch(item.name, query)}</div>
+                </div>`;
+        });
+        return html;
+    }
+
     /** Display suggestions */
-    function displaySuggestions(suggestions, query, suggestionsBox) {
+    function displaySuggestions(results, query, suggestionsBox) {
         currentFocus = -1;
-        if (!suggestions.length) {
+        const suggestions = results.products || [];
+        const hasGroups = ['categories', 'brands', 'vendors'].some(group => (results[group] || []).length);
+        if (!suggestions.length && !hasGroups) {
             showNoResults(suggestionsBox);
             return;
         }
@@ -205,6 +222,10 @@
                 </div>`;
         });
 
+        html += renderGroup('Categories', results.categories, query);
+        html += renderGroup('Brands', results.brands, query);
+        html += renderGroup('Stores', results.vendors, query);
+
         html += `
             <div class="suggestion-item view-all" data-query="${escapeHtml(query)}">
                 <div class="p-2 text-center text-primary">
@@ -227,6 +248,8 @@
                 const slug = this.dataset.productSlug;
                 if (slug) {
                     window.location.href = `/detail/${slug}/`;
+                } else if (this.dataset.url) {
+                    window.location.href = this.dataset.url;
                 } else {
                     navigateToSearchResults(query);
                 }